@@ -0,0 +1,154 @@
+# This file talks to the active.com search API for the race search on
+# the new goal page. Calls go through one requests session so the
+# connections are kept alive between searches, every call has a timeout,
+# and when a search has more than one page of results the rest of the
+# pages are fetched at the same time on a small pool of threads. Results
+# are de-duped and cached, since lots of people near each other look for
+# the same races in the same weeks.
+
+import os
+import time
+import threading
+import urllib
+import requests
+from math import ceil
+from multiprocessing.pool import ThreadPool
+from requests.adapters import HTTPAdapter
+from lrucache import LRUCache
+import metrics
+
+ACTIVEDOTCOM_KEY = os.environ["ACTIVEDOTCOM_KEY"]
+# Point this at mock_active.py to try race searches without the real API.
+ACTIVEDOTCOM_URL = os.environ.get("ACTIVEDOTCOM_URL", "http://api.amp.active.com/v2/search")
+
+# How many races to ask for per page, and how many pages at most.
+RACES_PER_PAGE = int(os.environ.get("RACES_PER_PAGE", 25))
+RACE_PAGES = int(os.environ.get("RACE_PAGES", 4))
+
+# Seconds to wait to connect and then for each response.
+CONNECT_TIMEOUT = float(os.environ.get("ACTIVEDOTCOM_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.environ.get("ACTIVEDOTCOM_READ_TIMEOUT", 10))
+
+# How many connections to keep open to active.com.
+POOL_SIZE = int(os.environ.get("ACTIVEDOTCOM_POOL_SIZE", 10))
+
+# Race search results are kept for RACE_CACHE_TTL seconds.
+RACE_CACHE_TTL = int(os.environ.get("RACE_CACHE_TTL", 3600))
+RACE_CACHE_SIZE = int(os.environ.get("RACE_CACHE_SIZE", 512))
+
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections = 1, pool_maxsize = POOL_SIZE))
+session.mount("https://", HTTPAdapter(pool_connections = 1, pool_maxsize = POOL_SIZE))
+
+# (distance attribute, min date, max date, zipcode, radius) -> list of races
+race_cache = LRUCache(RACE_CACHE_SIZE, ttl = RACE_CACHE_TTL)
+
+# The threads for fetching extra pages are started the first time they're needed.
+page_pool = []
+page_pool_lock = threading.Lock()
+
+
+def get_page_pool():
+	"""Returns the thread pool used to fetch pages after the first."""
+
+	with page_pool_lock:
+		if not page_pool:
+			page_pool.append(ThreadPool(max(RACE_PAGES - 1, 1)))
+		return page_pool[0]
+
+
+def search_races(distance_attribute, min_date, max_date, zipcode, radius = None):
+	"""Returns the de-duped races for a search, asking active.com only
+	if the same search hasn't been made recently."""
+
+	cache_key = (distance_attribute, str(min_date), str(max_date), str(zipcode), radius)
+
+	races = race_cache.get(cache_key)
+
+	if races == None:
+		races = list(unique_races(fetch_races(distance_attribute, min_date, max_date, zipcode, radius = radius)))
+		race_cache.set(cache_key, races)
+
+	return races
+
+
+def fetch_races(distance_attribute, min_date, max_date, zipcode, radius = None, pages = None):
+	"""Gets the first page of results within radius miles of the zipcode
+	(active.com's default if not given), then the rest of the pages all
+	at once, up to pages pages (RACE_PAGES if not given). Returns every 
+	result in page order."""
+
+	if pages == None:
+		pages = RACE_PAGES
+
+	# I decided to go with quality data over quantity.
+	# The search will only return results that have a url associated with the organizer.
+	params = {
+		# The attributes in model.distance_dictionary are already escaped
+		# for a url and requests escapes them again.
+		"attributes": urllib.unquote(distance_attribute),
+		"category": "event",
+		"start_date": str(min_date) + ".." + str(max_date),
+		"near": str(zipcode),
+		"exists": "homePageUrlAdr",
+		"per_page": RACES_PER_PAGE,
+		"api_key": ACTIVEDOTCOM_KEY,
+	}
+
+	if radius != None:
+		params["radius"] = radius
+
+	first_page = fetch_page(params, 1)
+	results = first_page[u'results']
+
+	total_results = first_page.get(u'total_results') or len(results)
+	number_of_pages = min(int(ceil(total_results / float(RACES_PER_PAGE))), pages)
+
+	if number_of_pages > 1:
+		extra_pages = get_page_pool().map(lambda page: fetch_extra_page(params, page), range(2, number_of_pages + 1))
+		for page_results in extra_pages:
+			results = results + page_results
+
+	return results
+
+
+def fetch_page(params, page):
+	"""Gets one page of search results as a dictionary."""
+
+	page_params = dict(params)
+	page_params["current_page"] = page
+
+	started = time.time()
+	try:
+		response = session.get(ACTIVEDOTCOM_URL, params = page_params, timeout = (CONNECT_TIMEOUT, READ_TIMEOUT))
+	except requests.RequestException:
+		metrics.observe_call("active.com", "error", time.time() - started)
+		raise
+	metrics.observe_call("active.com", response.status_code, time.time() - started)
+
+	response.raise_for_status()
+
+	return response.json()
+
+
+def fetch_extra_page(params, page):
+	"""Gets the results on a page after the first. If that page fails we
+	still have the first one, so we just go without it."""
+
+	try:
+		return fetch_page(params, page)[u'results']
+	except (requests.RequestException, ValueError, KeyError):
+		return []
+
+
+def unique_races(results):
+	"""Yields the results in order, skipping any race whose website
+	we've already seen. The same race often shows up more than once."""
+
+	seen_urls = set()
+
+	for result in results:
+		url = result['homePageUrlAdr']
+		if url not in seen_urls:
+			seen_urls.add(url)
+			yield result
@@ -0,0 +1,26 @@
+# This file holds the number crunching for the charts. Everything
+# here works on the numpy arrays in runcache.UserRuns, so the work
+# grows with the length of the arrays rather than with the number
+# of objects we build.
+
+import numpy
+
+
+def condition_counts(codes, names):
+	"""Returns a dictionary of how many times each condition shows up,
+	leaving out the ones that don't show up at all."""
+
+	# numpy 1.9 won't take a minlength of 0, which is what a user with no
+	# runs has.
+	if len(codes) == 0:
+		return {}
+
+	counts = numpy.bincount(codes, minlength = max(len(names), 1))
+
+	condition_dictionary = {}
+
+	for index in numpy.flatnonzero(counts):
+		condition_dictionary[names[index]] = int(counts[index])
+
+	return condition_dictionary
+
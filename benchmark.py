@@ -0,0 +1,226 @@
+# This file times the pages that get slower as people log more runs.
+# For each size it makes a database with generate_data.py (or reuses
+# the one it made last time), then requests every page through Flask's
+# test client a number of times, timing each request and noting how
+# many SQL statements sqlstats counted for it. Race searches use made-up
+# races instead of active.com, so it all runs offline. The results are
+# written as JSON.
+#
+# python benchmark.py --sizes 10 1000 100000 --output benchmark.json
+#
+# Each database is made and measured in its own process, since model.py
+# picks its database when it is imported.
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(sorted_values, fraction):
+	"""Returns the value fraction of the way through a sorted list."""
+
+	if not sorted_values:
+		return None
+
+	index = int(round(fraction * (len(sorted_values) - 1)))
+
+	return sorted_values[index]
+
+
+def summarize(times, statements):
+	"""Returns the numbers we report for one page, times in milliseconds."""
+
+	first = times[0]
+	warm = sorted(times[1:]) or [first]
+
+	return {
+		"requests": len(times),
+		"first_ms": round(first, 3),
+		"p50_ms": round(percentile(warm, 0.5), 3),
+		"p90_ms": round(percentile(warm, 0.9), 3),
+		"p99_ms": round(percentile(warm, 0.99), 3),
+		"max_ms": round(warm[-1], 3),
+		"mean_ms": round(sum(warm) / len(warm), 3),
+		"first_statements": statements[0],
+		"statements": statements[-1],
+	}
+
+
+# Where the zipcodes in seedruns.ZIPCODE_CHOICES are.
+STAND_IN_CENTROIDS = {
+	"92126": (32.9087, -117.1422),
+	"93711": (36.8327, -119.8310),
+	"94577": (37.7249, -122.1561),
+	"93720": (36.8608, -119.7600),
+}
+
+
+def stub_race_search():
+	"""Makes the race search answer with made-up races instead of
+	calling active.com."""
+
+	import activeclient
+	import mock_active
+	import zipgeo
+
+	# This runs offline, so without the zipcode file the made-up users'
+	# zipcodes stand in for it.
+	if zipgeo.ZIP_CENTROIDS_FILE and not os.path.exists(zipgeo.ZIP_CENTROIDS_FILE):
+		zipgeo.centroids.update(STAND_IN_CENTROIDS)
+
+	def fetch_races(distance_attribute, min_date, max_date, zipcode, radius = None, pages = None):
+		race_date = datetime.combine(min_date, datetime.min.time())
+		return [mock_active.make_race(distance_attribute, str(zipcode), race_date + timedelta(7 * number), number) for number in range(20)]
+
+	activeclient.fetch_races = fetch_races
+
+
+def pages_to_time(model, user):
+	"""Returns (name, url) for each page we time."""
+
+	goal = model.get_most_recent_goal(user)
+	latest_run = model.get_latest_run(user)
+
+	# The calendar on the landing page shows the last few months.
+	end = latest_run.date_run if latest_run != None else datetime.now()
+	start = end - timedelta(90)
+	epoch = datetime(1970, 1, 1)
+
+	pages = [
+		("user_landing", "/user_landing"),
+		("run_log", "/run_log"),
+		("run_log.json", "/run_log.json"),
+		("bar_chart", "/bar_chart?number_of_runs=5"),
+		("pie_chart", "/pie_chart?number_of_runs=5"),
+		("mood_map", "/mood_map?number_of_runs=5"),
+		("mood_map_before", "/mood_map_before?number_of_runs=5"),
+		("mood_map_during", "/mood_map_during?number_of_runs=5"),
+		("mood_map_after", "/mood_map_after?number_of_runs=5"),
+		("calendar_data.json", "/calendar_data.json?start=%d&end=%d" % ((start - epoch).total_seconds(), (end - epoch).total_seconds())),
+		("ideal_runs", "/ideal_runs"),
+		("race_search", "/race_search?goal=run_5k&zipcode=%s&fitness_level=2&run_length_history=2" % (user.zipcode or "94577")),
+	]
+
+	if latest_run != None:
+		pages.append(("view_run", "/view_run.html?run_id=%d" % latest_run.id))
+
+	if goal != None:
+		pages.append(("view_goal", "/view_goal.html?goal_id=%d" % goal.id))
+
+	return pages
+
+
+def measure(repeat, output):
+	"""Times every page against the database in RUNFREE_DATABASE_URL and
+	writes the results to output. Runs in its own process."""
+
+	os.environ.setdefault("ACTIVEDOTCOM_KEY", "benchmark")
+	sys.path.insert(0, HERE)
+
+	import model
+	import runfree
+
+	stub_race_search()
+
+	user = model.sqla_session.query(model.User).order_by(model.User.id).first()
+	pages = pages_to_time(model, user)
+	model.sqla_session.remove()
+
+	client = runfree.app.test_client()
+	with client.session_transaction() as flask_session:
+		flask_session["email"] = user.email
+
+	results = {}
+
+	for name, url in pages:
+		times = []
+		counts = []
+
+		for i in range(repeat):
+			started = time.time()
+			response = client.get(url)
+			times.append((time.time() - started) * 1000)
+			# sqlstats counts the statements for us.
+			counts.append(int(response.headers["X-SQL-Count"]))
+
+			if response.status_code != 200:
+				raise Exception("%s returned %d" % (url, response.status_code))
+
+		results[name] = summarize(times, counts)
+
+	with open(output, "w") as output_file:
+		json.dump(results, output_file)
+
+
+def make_database(path, users, runs, seed):
+	"""Makes a database with generate_data.py in its own process."""
+
+	environment = dict(os.environ)
+	environment["RUNFREE_DATABASE_URL"] = "sqlite:///" + path
+
+	subprocess.check_call([sys.executable, os.path.join(HERE, "generate_data.py"), "--users", str(users), "--runs", str(runs), "--seed", str(seed)], env = environment, stdout = open(os.devnull, "w"))
+
+
+def main(arguments):
+
+	parser = argparse.ArgumentParser(description = "Times the slow pages against made-up databases.")
+	parser.add_argument("--sizes", type = int, nargs = "+", default = [10, 1000, 100000], help = "runs per user")
+	parser.add_argument("--users", type = int, default = 2)
+	parser.add_argument("--seed", type = int, default = 1)
+	parser.add_argument("--repeat", type = int, default = 20, help = "requests per page")
+	parser.add_argument("--directory", default = os.path.join(tempfile.gettempdir(), "runfree_benchmark"), help = "where the databases are kept")
+	parser.add_argument("--rebuild", action = "store_true", help = "make the databases again even if they are there")
+	parser.add_argument("--output", default = "benchmark.json")
+	parser.add_argument("--measure", help = argparse.SUPPRESS)
+	options = parser.parse_args(arguments)
+
+	if options.measure:
+		measure(options.repeat, options.measure)
+		return 0
+
+	if not os.path.isdir(options.directory):
+		os.makedirs(options.directory)
+
+	report = {"date": datetime.now().isoformat(), "users": options.users, "seed": options.seed, "repeat": options.repeat, "sizes": {}}
+
+	for size in options.sizes:
+		path = os.path.join(options.directory, "runfree_%d_%d_%d.db" % (options.users, size, options.seed))
+
+		if options.rebuild and os.path.exists(path):
+			os.remove(path)
+
+		if not os.path.exists(path):
+			print "Making a database with %d users and %d runs each..." % (options.users, size)
+			make_database(path, options.users, size, options.seed)
+
+		print "Timing pages with %d runs per user..." % size
+
+		results_path = path + ".json"
+		environment = dict(os.environ)
+		environment["RUNFREE_DATABASE_URL"] = "sqlite:///" + path
+		subprocess.check_call([sys.executable, os.path.abspath(__file__), "--measure", results_path, "--repeat", str(options.repeat)], env = environment)
+
+		with open(results_path) as results_file:
+			report["sizes"][str(size)] = json.load(results_file)
+		os.remove(results_path)
+
+		for name, result in sorted(report["sizes"][str(size)].items()):
+			print "  %-20s p50 %8.2f ms  p90 %8.2f ms  %3d statements" % (name, result["p50_ms"], result["p90_ms"], result["statements"])
+
+	with open(options.output, "w") as output_file:
+		json.dump(report, output_file, indent = 2, sort_keys = True)
+
+	print "Wrote %s" % options.output
+
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,190 @@
+# This file makes big made-up databases for trying out how the app
+# does with lots of users and runs. Every user gets routes, a goal with
+# its subgoals, and runs with ratings picked the same way seedruns.py
+# picks them. The runs are made up on several processes at once and
+# written by this one with model.bulk_insert_runs. Everything comes from
+# the seed, so the same seed always makes the same database, no matter
+# how many processes are used.
+#
+# python generate_data.py --users 100 --runs 1000 --seed 1
+
+import sys
+import random
+import argparse
+import datetime
+import itertools
+import multiprocessing
+import model
+import seedqs
+import seedruns
+import milestones
+
+ROUTES_PER_USER = len(seedruns.MAP_CHOICES)
+
+# How many runs each process makes at a time.
+RUNS_PER_TASK = 5000
+
+# Runs are a day apart, like seedruns, unless there are more runs than
+# fit in this many days.
+MAX_DAYS = 3650
+
+FITNESS_LEVELS = ["1", "2", "3", "4", "5"]
+RUN_LENGTH_HISTORIES = ["1", "2", "3", "4"]
+
+
+def make_rng(seed, *numbers):
+	"""Returns a random number generator for one piece of the data, so
+	each piece comes out the same whichever process makes it."""
+
+	combined = seed
+	for number in numbers:
+		combined = combined * 1000003 + number
+
+	return random.Random(combined)
+
+
+def run_date(start_date, run_index, runs_per_user):
+	"""The date of a user's run_index'th run, to the minute like the
+	dates from the new run form."""
+
+	minutes = min(runs_per_user, MAX_DAYS) * 24 * 60
+
+	return start_date + datetime.timedelta(minutes = minutes * run_index // runs_per_user)
+
+
+def generate_runs(task):
+	"""Makes up a chunk of one user's runs. Runs on a worker process."""
+
+	seed, user_index, user_id, route_ids, first_run, number_of_runs, runs_per_user, start_date = task
+
+	rng = make_rng(seed, user_index, first_run // RUNS_PER_TASK)
+	runs = []
+
+	for run_index in range(first_run, first_run + number_of_runs):
+		date_run = run_date(start_date, run_index, runs_per_user)
+		run = seedruns.random_run(rng, user_id, date_run, map_choices = route_ids)
+		run["commit_date"] = date_run
+		runs.append(run)
+
+	return runs
+
+
+def insert_rows(table, rows):
+	"""Inserts rows into a table with ids handed out here. Returns the ids."""
+
+	first_id = model.reserve_next_id(table)
+
+	for i in range(len(rows)):
+		rows[i]["id"] = first_id + i
+
+	if rows:
+		model.sqla_session.execute(table.insert(), rows)
+
+	return [row["id"] for row in rows]
+
+
+def create_users(seed, number_of_users, runs_per_user, start_date):
+	"""Adds the users with their routes, goals and subgoals. Returns a
+	list of (user id, route ids)."""
+
+	first_user = model.reserve_next_id(model.User.__table__)
+	user_rows = []
+	route_rows = []
+	goal_rows = []
+
+	for user_index in range(number_of_users):
+		rng = make_rng(seed, user_index)
+		user_id = first_user + user_index
+		user_rows.append({"email": "runner%d@runfree.com" % user_id, "password": "password", "first": "Runner", "last": str(user_id), "zipcode": rng.choice(seedruns.ZIPCODE_CHOICES), "data_version": 0})
+
+		for route_number in range(ROUTES_PER_USER):
+			route_rows.append({"user_id": user_id, "title": "Route %d" % (route_number + 1), "location_description": "Made up route", "notes": None, "distance": rng.choice(seedruns.DISTANCE_CHOICES), "html_embed": "<p></p>"})
+
+		# The goal is set a little more than halfway through the runs.
+		description = rng.choice(sorted(model.subgoal_dictionary.keys()))
+		set_date = run_date(start_date, runs_per_user * 3 // 5, max(runs_per_user, 1))
+		goal_rows.append({"user_id": user_id, "description": description, "fitness_level": rng.choice(FITNESS_LEVELS), "run_length_history": rng.choice(RUN_LENGTH_HISTORIES), "set_date": set_date, "event_date": set_date + datetime.timedelta(12 * 7)})
+
+	user_ids = insert_rows(model.User.__table__, user_rows)
+	route_ids = insert_rows(model.Route.__table__, route_rows)
+	goal_ids = insert_rows(model.Goal.__table__, goal_rows)
+
+	subgoal_rows = []
+	for goal_id, goal_row in zip(goal_ids, goal_rows):
+		for description in model.subgoal_dictionary[goal_row["description"]]:
+			subgoal_rows.append({"goal_id": goal_id, "description": description})
+	insert_rows(model.Subgoal.__table__, subgoal_rows)
+
+	model.sqla_session.commit()
+
+	users = []
+	for user_index in range(number_of_users):
+		users.append((user_ids[user_index], route_ids[user_index * ROUTES_PER_USER:(user_index + 1) * ROUTES_PER_USER]))
+
+	return users
+
+
+def generate(number_of_users, runs_per_user, seed = 1, workers = None, start_date = datetime.datetime(2010, 1, 1, 8, 45)):
+	"""Adds number_of_users users with runs_per_user runs each to the
+	database. Returns the new user ids."""
+
+	model.create_db()
+	if model.sqla_session.query(model.Question).count() == 0:
+		seedqs.seed(seedqs.questions)
+
+	users = create_users(seed, number_of_users, runs_per_user, start_date)
+	print "Added %d users." % len(users)
+
+	tasks = []
+	for user_index in range(len(users)):
+		user_id, route_ids = users[user_index]
+		for first_run in range(0, runs_per_user, RUNS_PER_TASK):
+			tasks.append((seed, user_index, user_id, route_ids, first_run, min(RUNS_PER_TASK, runs_per_user - first_run), runs_per_user, start_date))
+
+	if workers == None:
+		workers = multiprocessing.cpu_count()
+
+	pool = None
+	if workers > 1:
+		pool = multiprocessing.Pool(workers)
+		chunks = pool.imap(generate_runs, tasks)
+	else:
+		chunks = itertools.imap(generate_runs, tasks)
+
+	# imap hands the chunks back in order, so the run ids always come
+	# out the same.
+	written = 0
+	for runs in chunks:
+		model.bulk_insert_runs(runs)
+		model.sqla_session.commit()
+		written = written + len(runs)
+		print "%d of %d runs written" % (written, runs_per_user * len(users))
+
+	if pool != None:
+		pool.close()
+		pool.join()
+
+	model.rebuild_run_stats()
+
+	for user_id, route_ids in users:
+		milestones.rebuild_milestone_candidates(model.sqla_session.query(model.User).get(user_id))
+
+	print "Done."
+
+	return [user_id for user_id, route_ids in users]
+
+
+def main(arguments):
+
+	parser = argparse.ArgumentParser(description = "Fills runfree.db with made-up users and runs.")
+	parser.add_argument("--users", type = int, default = 10)
+	parser.add_argument("--runs", type = int, default = 100, help = "runs per user")
+	parser.add_argument("--seed", type = int, default = 1)
+	parser.add_argument("--workers", type = int, default = None, help = "processes making runs, one per cpu by default")
+	options = parser.parse_args(arguments)
+
+	generate(options.users, options.runs, seed = options.seed, workers = options.workers)
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
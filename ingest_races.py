@@ -0,0 +1,59 @@
+# This file fills the race catalog that the race search reads from.
+# For every distance in model.distance_dictionary it asks active.com
+# for the upcoming races near each zipcode our users have signed up
+# with, saves them in the races table and removes races that are over.
+# A search that fails is printed and skipped, so one bad zipcode or a
+# slow moment at active.com doesn't stop the rest or the cleanup.
+# It should be run every so often, say once a night from cron:
+# python ingest_races.py
+
+import os
+import requests
+import model
+import activeclient
+from datetime import date, datetime, timedelta
+
+# How far ahead to look for races, and how many pages to get per search.
+INGEST_WEEKS = int(os.environ.get("INGEST_WEEKS", 52))
+INGEST_PAGES = int(os.environ.get("INGEST_PAGES", 10))
+
+
+def ingest_races(zipcodes = None):
+	"""Pulls upcoming races for every distance near every zipcode and
+	saves them. Returns how many races were saved."""
+
+	if zipcodes == None:
+		zipcodes = model.get_user_zipcodes()
+
+	min_date = date.today()
+	max_date = min_date + timedelta(INGEST_WEEKS * 7)
+
+	# A few goals share a distance, so each distance is only searched once.
+	distances = sorted(set(model.distance_dictionary.values()))
+
+	saved = 0
+	failed = 0
+
+	for distance in distances:
+		for zipcode in zipcodes:
+			try:
+				results = activeclient.fetch_races(distance, min_date, max_date, zipcode, pages = INGEST_PAGES)
+			except (requests.RequestException, ValueError, KeyError) as error:
+				failed = failed + 1
+				print "%s near %s failed: %r" % (distance, zipcode, error)
+				continue
+
+			saved = saved + len(model.save_races(distance, results))
+			model.sqla_session.commit()
+			print "%s near %s: %d races" % (distance, zipcode, len(results))
+
+	removed = model.remove_past_races(datetime.combine(min_date, datetime.min.time()))
+	model.sqla_session.commit()
+
+	print "Saved %d races and removed %d that are over. %d searches failed." % (saved, removed, failed)
+
+	return saved
+
+
+if __name__ == "__main__":
+	ingest_races()
@@ -0,0 +1,61 @@
+# A small dictionary-like cache that forgets the least recently
+# used entries once it is full. It is shared between request threads,
+# so every operation holds a lock. If it is given a ttl, entries are
+# also forgotten once they are more than ttl seconds old.
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+	"""Keeps at most max_size entries, dropping the least recently used,
+	and optionally dropping entries older than ttl seconds."""
+
+	def __init__(self, max_size = 128, ttl = None):
+		self.max_size = max_size
+		self.ttl = ttl
+		# key -> (value, time it expires or None)
+		self.entries = OrderedDict()
+		self.lock = threading.Lock()
+
+	def get(self, key, default = None):
+		"""Returns the cached value and marks it as recently used."""
+
+		with self.lock:
+			if key not in self.entries:
+				return default
+			value, expires = self.entries.pop(key)
+			if expires != None and expires <= time.time():
+				return default
+			self.entries[key] = (value, expires)
+			return value
+
+	def set(self, key, value):
+		"""Stores a value, dropping the oldest entry if the cache is full."""
+
+		expires = None
+		if self.ttl != None:
+			expires = time.time() + self.ttl
+
+		with self.lock:
+			if key in self.entries:
+				del self.entries[key]
+			self.entries[key] = (value, expires)
+			while len(self.entries) > self.max_size:
+				self.entries.popitem(last = False)
+
+	def delete(self, key):
+		"""Forgets a value if it is there."""
+
+		with self.lock:
+			self.entries.pop(key, None)
+
+	def clear(self):
+		"""Forgets everything."""
+
+		with self.lock:
+			self.entries.clear()
+
+	def __len__(self):
+		return len(self.entries)
@@ -0,0 +1,192 @@
+# This file keeps running totals of how the app is doing: how many
+# requests each endpoint handles, how long they take, how big the
+# responses are and how many fail, plus the same for our calls out to
+# active.com. The totals are shared by every thread in the process, and
+# /metrics shows them in the text format Prometheus and most other
+# scrapers read.
+#
+# Times are histograms, so a scraper can work out percentiles for any
+# stretch of time from the bucket counts, e.g. the share of dashboard
+# requests under 250ms:
+#
+# runfree_request_duration_seconds_bucket{endpoint="dashboard",le="0.25"} 981
+#
+# Each process keeps its own totals. With several worker processes,
+# scrape each of them.
+
+import time
+import threading
+from flask import request, g
+
+# Seconds. These cover quick chart data up to a race search that waits
+# on active.com.
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# Bytes.
+SIZE_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576]
+
+
+def label_text(labelnames, labels):
+	"""Formats labels like {endpoint="dashboard",status="200"}."""
+
+	if not labelnames:
+		return ""
+
+	pairs = []
+	for name, value in zip(labelnames, labels):
+		value = unicode(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+		pairs.append(u"%s=\"%s\"" % (name, value))
+
+	return u"{" + u",".join(pairs) + u"}"
+
+
+def number_text(number):
+	if isinstance(number, float):
+		return repr(number)
+
+	return str(number)
+
+
+class Counter(object):
+	"""A number that only goes up, kept for each set of labels."""
+
+	def __init__(self, name, help, labelnames = ()):
+		self.name = name
+		self.help = help
+		self.labelnames = tuple(labelnames)
+		self.values = {}
+		self.lock = threading.Lock()
+
+	def inc(self, labels = (), amount = 1):
+		with self.lock:
+			self.values[labels] = self.values.get(labels, 0) + amount
+
+	def lines(self):
+		yield "# HELP %s %s" % (self.name, self.help)
+		yield "# TYPE %s counter" % self.name
+
+		with self.lock:
+			values = sorted(self.values.items())
+
+		for labels, value in values:
+			yield u"%s%s %s" % (self.name, label_text(self.labelnames, labels), number_text(value))
+
+
+class Histogram(object):
+	"""Counts observations into buckets, kept for each set of labels,
+	along with their sum."""
+
+	def __init__(self, name, help, labelnames = (), buckets = LATENCY_BUCKETS):
+		self.name = name
+		self.help = help
+		self.labelnames = tuple(labelnames)
+		self.buckets = [float(bucket) for bucket in buckets]
+		# labels -> [count in each bucket, count, sum]
+		self.values = {}
+		self.lock = threading.Lock()
+
+	def observe(self, value, labels = ()):
+		with self.lock:
+			totals = self.values.get(labels)
+			if totals == None:
+				totals = self.values[labels] = [[0] * len(self.buckets), 0, 0.0]
+
+			for i in range(len(self.buckets)):
+				if value <= self.buckets[i]:
+					totals[0][i] = totals[0][i] + 1
+					break
+
+			totals[1] = totals[1] + 1
+			totals[2] = totals[2] + value
+
+	def lines(self):
+		yield "# HELP %s %s" % (self.name, self.help)
+		yield "# TYPE %s histogram" % self.name
+
+		with self.lock:
+			values = sorted((labels, (list(totals[0]), totals[1], totals[2])) for labels, totals in self.values.items())
+
+		labelnames = self.labelnames + ("le",)
+
+		for labels, (bucket_counts, count, total) in values:
+			# Bucket counts are cumulative in the text format.
+			running = 0
+			for bucket, bucket_count in zip(self.buckets, bucket_counts):
+				running = running + bucket_count
+				yield u"%s_bucket%s %d" % (self.name, label_text(labelnames, labels + (number_text(bucket),)), running)
+			yield u"%s_bucket%s %d" % (self.name, label_text(labelnames, labels + ("+Inf",)), count)
+			yield u"%s_sum%s %s" % (self.name, label_text(self.labelnames, labels), number_text(total))
+			yield u"%s_count%s %d" % (self.name, label_text(self.labelnames, labels), count)
+
+
+requests_total = Counter("runfree_requests_total", "Requests handled, by endpoint, method and status.", ["endpoint", "method", "status"])
+request_errors = Counter("runfree_request_errors_total", "Requests that failed with a server error, by endpoint.", ["endpoint"])
+request_duration = Histogram("runfree_request_duration_seconds", "Time spent handling requests, by endpoint.", ["endpoint"])
+response_size = Histogram("runfree_response_size_bytes", "Size of response bodies, by endpoint.", ["endpoint"], buckets = SIZE_BUCKETS)
+
+calls_total = Counter("runfree_outbound_requests_total", "Calls to other services, by service and status.", ["service", "status"])
+call_errors = Counter("runfree_outbound_errors_total", "Calls to other services that failed, by service.", ["service"])
+call_duration = Histogram("runfree_outbound_duration_seconds", "Time spent waiting on other services, by service.", ["service"])
+
+response_cache_lookups = Counter("runfree_response_cache_total", "Response cache lookups, by endpoint and whether they hit.", ["endpoint", "result"])
+
+ALL_METRICS = [requests_total, request_errors, request_duration, response_size, calls_total, call_errors, call_duration, response_cache_lookups]
+
+
+def observe_request(endpoint, method, status, seconds, size):
+	"""Records one request the app handled."""
+
+	endpoint = endpoint or "none"
+
+	requests_total.inc((endpoint, method, str(status)))
+	request_duration.observe(seconds, (endpoint,))
+	if size != None:
+		response_size.observe(size, (endpoint,))
+	if status >= 500:
+		request_errors.inc((endpoint,))
+
+
+def observe_call(service, status, seconds):
+	"""Records one call out to another service. status is the HTTP
+	status, or "error" if there wasn't a response."""
+
+	calls_total.inc((service, str(status)))
+	call_duration.observe(seconds, (service,))
+	if status == "error" or status >= 400:
+		call_errors.inc((service,))
+
+
+def render():
+	"""Returns every metric in the Prometheus text format."""
+
+	lines = []
+	for metric in ALL_METRICS:
+		lines.extend(metric.lines())
+
+	return u"\n".join(lines) + u"\n"
+
+
+def init_app(app):
+	"""Records every request the app handles."""
+
+	@app.before_request
+	def start_timer():
+		g.metrics_started = time.time()
+		g.metrics_recorded = False
+
+	@app.after_request
+	def record_request(response):
+		started = getattr(g, "metrics_started", None)
+		if started != None:
+			observe_request(request.endpoint, request.method, response.status_code, time.time() - started, response.calculate_content_length())
+			g.metrics_recorded = True
+
+		return response
+
+	# A request that raises never gets to after_request, so it's counted
+	# as a 500 here.
+	@app.teardown_request
+	def record_failure(exception):
+		started = getattr(g, "metrics_started", None)
+		if exception != None and started != None and not g.metrics_recorded:
+			observe_request(request.endpoint, request.method, 500, time.time() - started, None)
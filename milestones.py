@@ -0,0 +1,136 @@
+# This file works out which runs meet goal milestones. Every
+# milestone asks the same question: which runs after the date the goal
+# was set are at least X miles long? A MilestoneIndex keeps a user's
+# runs sorted by date with a tree of the longest distances, so the
+# question is answered in logarithmic time instead of looking at every
+# run for every milestone. Day to day the latest runs for each milestone
+# are saved as its candidates when a run is saved (see
+# model.record_milestone_candidates); the index is used to work them all
+# out at once for a user.
+
+import bisect
+import model
+import runcache
+from datetime import datetime
+from lrucache import LRUCache
+
+
+class MilestoneIndex(object):
+	"""A user's runs sorted by date, oldest first, plus a segment tree
+	where every node holds the longest distance among the runs below it."""
+
+	def __init__(self, dates, distances, run_ids):
+		self.dates = dates
+		self.distances = distances
+		self.run_ids = run_ids
+
+		# The leaves start at self.size. Node i has children 2i and 2i + 1.
+		self.size = 1
+		while self.size < len(distances):
+			self.size = self.size * 2
+
+		self.longest = [float("-inf")] * (2 * self.size)
+
+		for i in range(len(distances)):
+			# Runs without a distance (NaN) never meet a milestone.
+			if distances[i] == distances[i]:
+				self.longest[self.size + i] = distances[i]
+
+		for node in range(self.size - 1, 0, -1):
+			self.longest[node] = max(self.longest[2 * node], self.longest[2 * node + 1])
+
+	def first_after(self, date):
+		"""Returns the position of the first run strictly after date."""
+
+		return bisect.bisect_right(self.dates, date)
+
+	def latest_runs_reaching(self, date, distance, limit):
+		"""Returns the ids of up to limit of the latest runs after date
+		that are at least distance long, newest first."""
+
+		return [self.run_ids[position] for position in self.positions_reaching(date, distance, limit = limit, newest_first = True)]
+
+	def positions_reaching(self, date, distance, limit = None, newest_first = False):
+		"""Walks down the tree into the branches whose longest run is
+		long enough, skipping everything else, and returns the positions
+		of the runs it finds in date order, or newest first."""
+
+		start = self.first_after(date)
+		positions = []
+
+		if start >= len(self.distances):
+			return positions
+
+		# Each entry is (node, first position, last position) covered by the node.
+		stack = [(1, 0, self.size - 1)]
+
+		while stack:
+			node, low, high = stack.pop()
+
+			if high < start or self.longest[node] < distance:
+				continue
+
+			if low == high:
+				positions.append(low)
+				if limit != None and len(positions) >= limit:
+					break
+				continue
+
+			middle = (low + high) // 2
+			# The child that goes on last is looked at first.
+			if newest_first:
+				stack.append((2 * node, low, middle))
+				stack.append((2 * node + 1, middle + 1, high))
+			else:
+				stack.append((2 * node + 1, middle + 1, high))
+				stack.append((2 * node, low, middle))
+
+		return positions
+
+
+# user id -> (data version, MilestoneIndex)
+cache = LRUCache(runcache.RUN_CACHE_SIZE)
+
+
+def get_milestone_index(user_id):
+	"""Returns the milestone index for a user, built from their cached
+	runs and rebuilt whenever those change."""
+
+	user_runs = runcache.get_user_runs(user_id)
+
+	cached = cache.get(user_id)
+
+	if cached != None and cached[0] == user_runs.version:
+		return cached[1]
+
+	# The run cache is newest first, the index wants oldest first.
+	index = MilestoneIndex(user_runs.dates[::-1].tolist(), user_runs.distances[::-1].tolist(), user_runs.ids[::-1].tolist())
+
+	cache.set(user_id, (user_runs.version, index))
+
+	return index
+
+
+def rebuild_milestone_candidates(user):
+	"""Works out the milestone candidates for all of a user's outstanding
+	goals and subgoals from scratch, for databases that had runs before
+	candidates were saved or that kept a different number of them."""
+
+	model.sqla_session.query(model.MilestoneCandidate).filter_by(user_id = user.id).delete(synchronize_session = False)
+
+	index = get_milestone_index(user.id)
+	detected_date = datetime.now()
+	candidates = []
+
+	milestones = [(goal.id, None, goal.set_date, model.distance_int_dictionary[goal.description]) for goal in model.get_outstanding_goals(user)]
+	milestones.extend((subgoal.goal_id, subgoal.id, subgoal.goal.set_date, model.distance_int_dictionary[subgoal.description]) for subgoal in model.get_outstanding_subgoals(user))
+
+	for goal_id, subgoal_id, set_date, distance in milestones:
+		for run_id in index.latest_runs_reaching(set_date, distance, model.MILESTONE_CANDIDATE_LIMIT):
+			candidates.append({"user_id": user.id, "goal_id": goal_id, "subgoal_id": subgoal_id, "run_id": run_id, "detected_date": detected_date})
+
+	if candidates:
+		model.sqla_session.execute(model.MilestoneCandidate.__table__.insert(), candidates)
+	model.sqla_session.commit()
+
+	return len(candidates)
@@ -0,0 +1,83 @@
+# A stand-in for the active.com search API, so race searches can be
+# tried out without an API key or a network connection. It makes up
+# races in the requested date range, with some of them listed twice like
+# the real API does, hands them out a page at a time, and counts how many
+# pages it has served. MOCK_DELAY makes each page slow, to see the pages
+# being fetched at the same time, and MOCK_FAIL_PAGES (like "2,3") makes
+# those pages answer with an error.
+#
+# python mock_active.py
+# ACTIVEDOTCOM_KEY=anything ACTIVEDOTCOM_URL=http://localhost:5001/v2/search python runfree.py
+
+import os
+import re
+import json
+import time
+from datetime import datetime, timedelta
+from flask import Flask, request
+
+app = Flask(__name__)
+
+RACES_PER_SEARCH = int(os.environ.get("MOCK_RACES_PER_SEARCH", 40))
+MOCK_DELAY = float(os.environ.get("MOCK_DELAY", 0))
+MOCK_FAIL_PAGES = set(int(page) for page in os.environ.get("MOCK_FAIL_PAGES", "").split(",") if page.strip())
+
+searches = {"count": 0}
+
+
+def make_race(attribute, zipcode, race_date, number):
+	"""Makes up one race in the shape the new goal page expects."""
+
+	slug = re.sub(r"[^a-z0-9]+", "-", attribute.lower()).strip("-")
+	url = "http://races.example.com/%s/%s/%d" % (zipcode, slug, number)
+
+	return {
+		"assetGuid": "mock-%s-%s-%d" % (zipcode, slug, number),
+		"assetName": "Mock Race %d" % number,
+		"homePageUrlAdr": url,
+		"registrationUrlAdr": url + "/register",
+		"activityStartDate": datetime.strftime(race_date, "%Y-%m-%dT08:00:00"),
+		"assetDescriptions": [{"description": "A made up race near %s." % zipcode}],
+		"place": {"postalCode": zipcode},
+	}
+
+
+@app.route("/v2/search")
+def search():
+	searches["count"] = searches["count"] + 1
+	time.sleep(MOCK_DELAY)
+
+	attribute = request.args.get("attributes", "")
+	zipcode = request.args.get("near", "")
+	start_date, end_date = [datetime.strptime(day, "%Y-%m-%d") for day in request.args.get("start_date", "").split("..")]
+	per_page = int(request.args.get("per_page", 10))
+	current_page = int(request.args.get("current_page", 1))
+
+	if current_page in MOCK_FAIL_PAGES:
+		return "Made up failure", 500
+
+	results = []
+
+	for number in range(RACES_PER_SEARCH):
+		# The races are spread out over the dates asked for.
+		race_date = start_date + timedelta((end_date - start_date).days * number // RACES_PER_SEARCH)
+		race = make_race(attribute, zipcode, race_date, number)
+		results.append(race)
+		# Every other race shows up twice.
+		if number % 2 == 0:
+			results.append(race)
+
+	start = (current_page - 1) * per_page
+
+	return json.dumps({"results": results[start:start + per_page], "total_results": len(results), "items_per_page": per_page, "start_index": start})
+
+
+@app.route("/searches")
+def search_count():
+	"""How many pages have been served, to check the cache."""
+
+	return json.dumps(searches)
+
+
+if __name__ == "__main__":
+	app.run(threaded = True, port = int(os.environ.get("MOCK_ACTIVE_PORT", 5001)))
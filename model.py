@@ -2,16 +2,127 @@
 # etc. will live here. 
 
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import create_engine
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Boolean
-from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy import ForeignKey
+from sqlalchemy import create_engine, select, inspect, func, and_, or_, Table, MetaData
+from sqlalchemy import Column, Integer, SmallInteger, String, DateTime, Float, Text, Boolean, Index
+from sqlalchemy import TypeDecorator, type_coerce, case
+from sqlalchemy.orm import sessionmaker, scoped_session, contains_eager, joinedload
+from sqlalchemy import ForeignKey, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.expression import Insert, Update, Delete
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.orm import relationship, backref
 from datetime import date
 from datetime import datetime
+import os
+import json
+import zipgeo
 
-ENGINE = create_engine("sqlite:///runfree.db", echo=False)
-sqla_session = scoped_session(sessionmaker(bind=ENGINE, autocommit = False, autoflush = False))
+# Which database to use. Anything SQLAlchemy understands will do.
+DATABASE_URL = os.environ.get("RUNFREE_DATABASE_URL", "sqlite:///runfree.db")
+
+# Reads for GET requests can go to another database, like a replica.
+# By default they go to the same one over read only connections.
+READ_DATABASE_URL = os.environ.get("RUNFREE_READ_DATABASE_URL", DATABASE_URL)
+
+# Connections kept open for each engine, how many more can be opened
+# when they're all busy, and how long to wait (seconds) for one before
+# giving up.
+DATABASE_POOL_SIZE = int(os.environ.get("RUNFREE_DATABASE_POOL_SIZE", 5))
+DATABASE_MAX_OVERFLOW = int(os.environ.get("RUNFREE_DATABASE_MAX_OVERFLOW", 10))
+DATABASE_POOL_TIMEOUT = float(os.environ.get("RUNFREE_DATABASE_POOL_TIMEOUT", 30))
+
+# Seconds before a connection is replaced, for servers that close idle
+# ones. -1 keeps them forever.
+DATABASE_POOL_RECYCLE = int(os.environ.get("RUNFREE_DATABASE_POOL_RECYCLE", -1))
+
+# SQLite only. How long (milliseconds) to wait for another connection's
+# write to finish before giving up with "database is locked".
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("RUNFREE_SQLITE_BUSY_TIMEOUT", 5000))
+
+# Set on every SQLite connection. WAL lets readers carry on while
+# someone writes, and with it synchronous=NORMAL is still safe from
+# corruption while only syncing at checkpoints. The cache is in KiB
+# when negative, so each connection keeps up to 20MB of pages.
+SQLITE_PRAGMAS = [
+	("journal_mode", "WAL"),
+	("synchronous", "NORMAL"),
+	("busy_timeout", SQLITE_BUSY_TIMEOUT),
+	("cache_size", int(os.environ.get("RUNFREE_SQLITE_CACHE_SIZE", -20000))),
+	("mmap_size", int(os.environ.get("RUNFREE_SQLITE_MMAP_SIZE", 268435456))),
+	("temp_store", "MEMORY"),
+]
+
+
+def make_engine(url, read_only = False):
+	"""Makes an engine for url with the pool settings above. SQLite
+	connections get SQLITE_PRAGMAS, and read only ones refuse to write."""
+
+	url = make_url(url)
+	options = {"echo": False}
+
+	if url.drivername.startswith("sqlite"):
+		if url.database in [None, "", ":memory:"]:
+			# An in memory database only lives as long as its one
+			# connection, so it's left to SQLAlchemy's defaults.
+			return create_engine(url, **options)
+
+		# SQLAlchemy doesn't pool SQLite file connections by default, 
+		# which would throw the page cache away with every session. The
+		# pool only ever lends a connection to one thread at a time.
+		options["poolclass"] = QueuePool
+		options["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT / 1000.0}
+
+	options["pool_size"] = DATABASE_POOL_SIZE
+	options["max_overflow"] = DATABASE_MAX_OVERFLOW
+	options["pool_timeout"] = DATABASE_POOL_TIMEOUT
+	options["pool_recycle"] = DATABASE_POOL_RECYCLE
+
+	engine = create_engine(url, **options)
+
+	if url.drivername.startswith("sqlite"):
+		def set_pragmas(dbapi_connection, connection_record):
+			cursor = dbapi_connection.cursor()
+			for name, value in SQLITE_PRAGMAS:
+				cursor.execute("PRAGMA %s = %s" % (name, value))
+			if read_only:
+				cursor.execute("PRAGMA query_only = ON")
+			cursor.close()
+
+		event.listen(engine, "connect", set_pragmas)
+
+	return engine
+
+
+ENGINE = make_engine(DATABASE_URL)
+
+if make_url(READ_DATABASE_URL).database in [None, "", ":memory:"]:
+	READ_ENGINE = ENGINE
+else:
+	READ_ENGINE = make_engine(READ_DATABASE_URL, read_only = True)
+
+
+class RoutingSession(Session):
+	"""A session that reads from READ_ENGINE while read_only is set.
+	Writes always go to ENGINE, so a GET that does save something still
+	works, it just doesn't get the read only connection for it."""
+
+	read_only = False
+
+	def get_bind(self, mapper = None, clause = None):
+		if self.read_only and not self._flushing and not isinstance(clause, (Insert, Update, Delete)):
+			return READ_ENGINE
+
+		return ENGINE
+
+
+sqla_session = scoped_session(sessionmaker(class_ = RoutingSession, autocommit = False, autoflush = False))
+
+
+def use_read_engine(read_only):
+	"""Sets whether this thread's session reads from READ_ENGINE."""
+
+	sqla_session().read_only = read_only
 
 Base = declarative_base()
 Base.query = sqla_session.query_property()
@@ -33,6 +144,9 @@ class User(Base):
 	birthdate = Column(DateTime(timezone = False), nullable = True)
 	sex = Column(String(15), nullable = True)
 	zipcode = Column(String(15), nullable = True)
+	# Goes up every time the user's runs change, so cached copies
+	# of them know when they are out of date. 
+	data_version = Column(Integer, nullable = True, default = 0)
 
 	runs = relationship("Run", backref=backref("user"))
 	goals = relationship("Goal", backref=backref("user"))
@@ -44,6 +158,10 @@ class User(Base):
 class Run(Base):
 
 	__tablename__ = "runs"
+	__table_args__ = (
+		Index("ix_runs_user_date_run", "user_id", "date_run"), 
+		Index("ix_runs_user_commit_date", "user_id", "commit_date"),
+	)
 
 	id = Column(Integer, primary_key = True)
 	user_id = Column(Integer, ForeignKey("users.id"))
@@ -53,6 +171,7 @@ class Run(Base):
 	approx_time = Column(Integer, nullable = True)
 	commit_date = Column(DateTime(timezone = False), nullable = False)
 	route = Column(Integer, ForeignKey("routes.id"), nullable = True)
+	score = Column(Float, nullable = True)
 
 	ratings = relationship("Rating", backref=backref("run"))
  
@@ -74,6 +193,10 @@ class Question(Base):
 class Rating(Base):
 
 	__tablename__ = "ratings"
+	__table_args__ = (
+		Index("ix_ratings_run_question", "run_id", "question_id"), 
+		Index("ix_ratings_user_question_run", "user_id", "question_id", "run_id"),
+	)
 
 	id = Column(Integer, primary_key = True)
 	user_id = Column(Integer, ForeignKey("users.id"))
@@ -86,9 +209,85 @@ class Rating(Base):
 	def __repr__(self):
 		return "User ID: %d, Run ID: %d, Question ID: %d" % (self.user_id, self.run_id, self.question_id)
 
+# The choices for location, terrain and route type, in the order of
+# their dictionaries at the bottom of this file. run_answers stores
+# each answer as its place in the list, so new choices go on the end.
+location_codes = ["park", "city", "neighborhood", "trail", "beach", "treadmill", "track"]
+terrain_codes = ["flat", "downhill", "uphill", "hills"]
+route_codes = ["point_to_point", "out_and_back", "treadmill", "track", "random", "loop"]
+
+class Choice(TypeDecorator):
+	"""One of a list of choices, stored as its place in the list. Python
+	code still sees the choice itself."""
+
+	impl = SmallInteger
+
+	def __init__(self, choices):
+		TypeDecorator.__init__(self)
+		self.choices = choices
+
+	def process_bind_param(self, value, dialect):
+		if value == None:
+			return None
+		if value not in self.choices:
+			raise ValueError("%r isn't one of %s" % (value, ", ".join(self.choices)))
+
+		return self.choices.index(value)
+
+	def process_result_value(self, value, dialect):
+		if value == None:
+			return None
+
+		return self.choices[value]
+
+class RunAnswer(Base):
+	"""One row per run holding the answers to questions 1-8, so the
+	analytics don't have to dig through the ratings table question by question.
+	Feeling stays as text, since it has no list of choices and imported
+	runs can have any word there."""
+
+	__tablename__ = "run_answers"
+
+	run_id = Column(Integer, ForeignKey("runs.id"), primary_key = True)
+	user_id = Column(Integer, ForeignKey("users.id"))
+	pre_run = Column(Integer, nullable = True)
+	during_run = Column(Integer, nullable = True)
+	post_run = Column(Integer, nullable = True)
+	energy = Column(Integer, nullable = True)
+	feeling = Column(String(20), nullable = True)
+	location = Column(Choice(location_codes), nullable = True)
+	terrain = Column(Choice(terrain_codes), nullable = True)
+	route_type = Column(Choice(route_codes), nullable = True)
+
+	run = relationship("Run", backref=backref("answers", uselist = False))
+
+	def __repr__(self):
+		return "Answers for Run ID: %d" % self.run_id
+
+class RunStat(Base):
+	"""Running totals of a user's runs, kept per score and per condition
+	so the ideal run page can be answered without reading every run.
+	The score is stored as 5 * during + 2 * after + 3 * energy, which is
+	ten times the run score and always a whole number."""
+
+	__tablename__ = "run_stats"
+
+	user_id = Column(Integer, ForeignKey("users.id"), primary_key = True)
+	score_key = Column(Integer, primary_key = True)
+	condition = Column(String(20), primary_key = True)
+	value = Column(String(20), primary_key = True)
+	run_count = Column(Integer, nullable = False, default = 0)
+	distance_sum = Column(Float, nullable = False, default = 0.0)
+
+	def __repr__(self):
+		return "User: %d, Score: %d, %s %s: %d runs" % (self.user_id, self.score_key, self.condition, self.value, self.run_count)
+
 class Goal(Base):
 
 	__tablename__ = "goals"
+	__table_args__ = (
+		Index("ix_goals_user_set_date", "user_id", "set_date"),
+	)
 
 	id = Column(Integer, primary_key = True)
 	user_id = Column(Integer, ForeignKey("users.id"))
@@ -109,6 +308,9 @@ class Goal(Base):
 class Subgoal(Base):
 
 	__tablename__ = "subgoals"
+	__table_args__ = (
+		Index("ix_subgoals_goal", "goal_id"),
+	)
 
 	id = Column(Integer, primary_key = True)
 	goal_id = Column(Integer, ForeignKey("goals.id"))
@@ -122,9 +324,44 @@ class Subgoal(Base):
 	def __repr__(self):
 		return "%s" % self.description
 
+# How many runs the dashboard and goal page offer for confirming each
+# goal and subgoal, the latest ones that meet it.
+MILESTONE_CANDIDATE_LIMIT = int(os.environ.get("RUNFREE_MILESTONE_CANDIDATES", 10))
+
+class MilestoneCandidate(Base):
+	"""A run that meets an outstanding goal or subgoal. Each one keeps
+	its latest MILESTONE_CANDIDATE_LIMIT runs, worked out when a run is
+	saved, so the dashboard and the goal page only have to read them.
+	subgoal_id is empty when the run meets the goal itself."""
+
+	__tablename__ = "milestone_candidates"
+	__table_args__ = (
+		Index("ix_milestone_candidates_user", "user_id"), 
+		Index("ix_milestone_candidates_goal", "goal_id"), 
+		Index("ix_milestone_candidates_subgoal", "subgoal_id"), 
+		Index("ix_milestone_candidates_run", "run_id"),
+	)
+
+	id = Column(Integer, primary_key = True)
+	user_id = Column(Integer, ForeignKey("users.id"))
+	goal_id = Column(Integer, ForeignKey("goals.id"))
+	subgoal_id = Column(Integer, ForeignKey("subgoals.id"), nullable = True)
+	run_id = Column(Integer, ForeignKey("runs.id"))
+	detected_date = Column(DateTime(timezone = False), nullable = False)
+
+	goal = relationship("Goal")
+	subgoal = relationship("Subgoal")
+	run = relationship("Run")
+
+	def __repr__(self):
+		return "Goal: %d, Subgoal: %s, Run: %d" % (self.goal_id, self.subgoal_id, self.run_id)
+
 class Route(Base):
 
 	__tablename__ = "routes"
+	__table_args__ = (
+		Index("ix_routes_user", "user_id"),
+	)
 
 	id = Column(Integer, primary_key = True)
 	user_id = Column(Integer, ForeignKey("users.id"))
@@ -139,6 +376,45 @@ class Route(Base):
 	def __repr__(self):
 		return "%s : %f Miles" % (self.location_description, self.distance)
 
+class Race(Base):
+	"""An upcoming event from active.com. ingest_races.py fills these in
+	ahead of time so the race search doesn't have to wait on active.com.
+	distance is the attribute from distance_dictionary and raw is the 
+	result exactly as active.com sent it, which is what the new goal page
+	reads. latitude and longitude come from active.com, or from the 
+	centroid of the race's zipcode. An event with a 5k and a 10k has a
+	row for each distance."""
+
+	__tablename__ = "races"
+	__table_args__ = (
+		Index("ix_races_id_for_api_distance", "id_for_api", "distance", unique = True),
+		Index("ix_races_zip_prefix_distance_date", "zip_prefix", "distance", "event_date"),
+		Index("ix_races_distance_date", "distance", "event_date"),
+		Index("ix_races_distance_latitude", "distance", "latitude"),
+		Index("ix_races_event_date", "event_date"),
+	)
+
+	id = Column(Integer, primary_key = True)
+	id_for_api = Column(String(100), nullable = False)
+	name = Column(String(200))
+	url = Column(String(200))
+	distance = Column(String(100), nullable = False)
+	event_date = Column(DateTime(timezone = False), nullable = False)
+	zipcode = Column(String(15))
+	zip_prefix = Column(String(3))
+	latitude = Column(Float, nullable = True)
+	longitude = Column(Float, nullable = True)
+	raw = Column(Text, nullable = False)
+	updated_date = Column(DateTime(timezone = False), nullable = False)
+
+	def result(self):
+		"""The race as active.com described it."""
+
+		return json.loads(self.raw)
+
+	def __repr__(self):
+		return "%s : %s" % (self.name, self.event_date)
+
 
 
 # -----------Classes End--------------------------
@@ -166,6 +442,19 @@ def insert_new_run(new_run):
 	sqla_session.add(new_run)
 	sqla_session.commit()
 
+def get_data_version(user_id):
+	"""Returns the number that changes whenever the user's data changes."""
+
+	version = sqla_session.query(User.data_version).filter_by(id = user_id).first()
+
+	return version[0] or 0
+
+def bump_data_version(user_id):
+	"""Marks the user's data as changed. The caller commits, so the new
+	version goes in with the change itself."""
+
+	sqla_session.query(User).filter_by(id = user_id).update({User.data_version: func.coalesce(User.data_version, 0) + 1}, synchronize_session = False)
+
 def get_latest_run(user):
 	"""Will find a run with a particular time stamp."""
 	run = sqla_session.query(Run).filter_by(user_id = user.id).order_by(Run.commit_date.desc()).first()
@@ -192,6 +481,21 @@ def find_all_runs_desc(user):
 
 	return runs
 
+def get_runs_page(user, page_size = 25, before_date = None, before_id = None):
+	"""Returns up to page_size of the user's runs, newest first, that come
+	after the run with before_date and before_id in that order. Leave
+	them out for the first page. Also returns whether there are more."""
+
+	runs = sqla_session.query(Run).filter(Run.user_id == user.id)
+
+	if before_date != None:
+		runs = runs.filter(or_(Run.date_run < before_date, and_(Run.date_run == before_date, Run.id < before_id)))
+
+	# Asking for one extra run tells us if there is another page. 
+	runs = runs.order_by(Run.date_run.desc(), Run.id.desc()).limit(page_size + 1).all()
+
+	return runs[:page_size], len(runs) > page_size
+
 
 def insert_new_goal(new_goal):
 	"""Will insert a new goal into the database."""
@@ -233,26 +537,15 @@ def get_all_goals(user):
 	return goals
 
 def get_outstanding_goals(user):
-	"""returns a list of outstanding subgoal objects, that is, those that are not complete"""
-	goals = get_all_goals(user)
-	outstanding_goals = []
-
-	for goal in goals:
-		if not goal.date_completed:
-			outstanding_goals.append(goal)
+	"""returns a list of outstanding goal objects, that is, those that are not complete"""
+	outstanding_goals = sqla_session.query(Goal).filter(Goal.user_id == user.id, Goal.date_completed == None).order_by(Goal.id).all()
 
 	return outstanding_goals
 
 def get_outstanding_subgoals(user):
-	"""returns a list of outstanding subgoal objects, that is, those that are not complete"""
-	goals = get_all_goals(user)
-	outstanding_subgoals = []
-
-	for goal in goals:
-		subgoals = get_subgoals_by_goal_id(goal.id)
-		for subgoal in subgoals:
-			if not subgoal.date_completed:
-				outstanding_subgoals.append(subgoal)
+	"""returns a list of outstanding subgoal objects, that is, those that are not complete. 
+	Their goals are loaded in the same query."""
+	outstanding_subgoals = sqla_session.query(Subgoal).join(Goal, Goal.id == Subgoal.goal_id).options(contains_eager(Subgoal.goal)).filter(Goal.user_id == user.id, Subgoal.date_completed == None).order_by(Goal.id, Subgoal.id).all()
 
 	return outstanding_subgoals
 
@@ -278,32 +571,121 @@ def get_runs_after_date(user, date):
 
 	return runs_after_date
 
+def latest_runs_reaching(user_id, date, distance, limit, exclude_run_id = None):
+	"""Returns up to limit of the latest runs after date that are at 
+	least distance long, newest first."""
+
+	runs = sqla_session.query(Run).filter(Run.user_id == user_id, Run.date_run > date, Run.approx_dist >= distance)
+
+	if exclude_run_id != None:
+		runs = runs.filter(Run.id != exclude_run_id)
+
+	return runs.order_by(Run.date_run.desc(), Run.id.desc()).limit(limit).all()
+
+def record_milestone_candidates(run, deleted = False):
+	"""Keeps the candidates for each outstanding goal and subgoal, the 
+	latest MILESTONE_CANDIDATE_LIMIT runs that meet it, up to date after
+	run is added, edited or (with deleted) about to be deleted. Only the
+	milestones this run could change are looked at again. The caller 
+	commits."""
+
+	# An edit has to be in the database before the runs are searched.
+	sqla_session.flush()
+
+	detected_date = datetime.now()
+	candidates = {}
+	for candidate in sqla_session.query(MilestoneCandidate).options(joinedload(MilestoneCandidate.run)).filter_by(user_id = run.user_id):
+		candidates.setdefault((candidate.goal_id, candidate.subgoal_id), []).append(candidate)
+
+	milestones = [(goal.id, None, goal.set_date, distance_int_dictionary[goal.description]) for goal in get_outstanding_goals(run.user)]
+	milestones.extend((subgoal.goal_id, subgoal.id, subgoal.goal.set_date, distance_int_dictionary[subgoal.description]) for subgoal in get_outstanding_subgoals(run.user))
+
+	for goal_id, subgoal_id, set_date, distance in milestones:
+		kept = candidates.get((goal_id, subgoal_id), [])
+		meets = not deleted and run.date_run > set_date and run.approx_dist >= distance
+
+		if run.id in [candidate.run_id for candidate in kept]:
+			# An edit can move the run or make it too short, and a deleted
+			# run leaves room for an older one, so the runs are found again.
+			runs = latest_runs_reaching(run.user_id, set_date, distance, MILESTONE_CANDIDATE_LIMIT, exclude_run_id = run.id if deleted else None)
+		elif meets and (len(kept) < MILESTONE_CANDIDATE_LIMIT or (kept and (run.date_run, run.id) > min((candidate.run.date_run, candidate.run_id) for candidate in kept))):
+			runs = sorted([candidate.run for candidate in kept] + [run], key = lambda kept_run: (kept_run.date_run, kept_run.id), reverse = True)[:MILESTONE_CANDIDATE_LIMIT]
+		else:
+			continue
+
+		run_ids = set(new_run.id for new_run in runs)
+		kept_run_ids = set(candidate.run_id for candidate in kept)
+
+		for candidate in kept:
+			if candidate.run_id not in run_ids:
+				sqla_session.delete(candidate)
+
+		for new_run in runs:
+			if new_run.id not in kept_run_ids:
+				sqla_session.add(MilestoneCandidate(user_id = run.user_id, goal_id = goal_id, subgoal_id = subgoal_id, run = new_run, detected_date = detected_date))
+
+def clear_milestone_candidates(goal_id = None, subgoal_id = None):
+	"""Removes the candidates for a subgoal, or for the goal itself, once 
+	the user confirms it. The caller commits."""
+
+	candidates = sqla_session.query(MilestoneCandidate)
+
+	if subgoal_id != None:
+		candidates = candidates.filter_by(subgoal_id = subgoal_id)
+	else:
+		candidates = candidates.filter_by(goal_id = goal_id, subgoal_id = None)
+
+	candidates.delete(synchronize_session = False)
+
+def get_milestone_candidates(user, goal_id = None):
+	"""Returns (subgoal candidates, goal candidates) for a user, or for
+	just one of their goals, with the runs and goals loaded alongside."""
+
+	candidates = sqla_session.query(MilestoneCandidate).join(Run, Run.id == MilestoneCandidate.run_id).options(contains_eager(MilestoneCandidate.run), joinedload(MilestoneCandidate.goal), joinedload(MilestoneCandidate.subgoal)).filter(MilestoneCandidate.user_id == user.id)
+
+	if goal_id != None:
+		candidates = candidates.filter(MilestoneCandidate.goal_id == goal_id)
+
+	candidates = candidates.order_by(MilestoneCandidate.goal_id, MilestoneCandidate.subgoal_id, Run.date_run).all()
+
+	subgoal_candidates = [candidate for candidate in candidates if candidate.subgoal_id != None]
+	goal_candidates = [candidate for candidate in candidates if candidate.subgoal_id == None]
+
+	return subgoal_candidates, goal_candidates
+
 def get_ratings_for_run(run_id):
 	"""returns all ratings for a given run."""
 	ratings = sqla_session.query(Rating).filter_by(run_id = run_id).all()
 
 	return ratings
 
+def get_answers_by_run_id(run_id):
+	"""returns the run answers row for the provided run id."""
+
+	answers = sqla_session.query(RunAnswer).filter_by(run_id = run_id).one()
+
+	return answers
+
 def get_location_by_run_id(run_id):
 	""""returns the location of a run with the provided run id. """
 
-	location = sqla_session.query(Rating).filter_by(run_id = run_id, question_id = 6).one()
+	location = sqla_session.query(RunAnswer.location).filter_by(run_id = run_id).one()
 
-	return location
+	return location[0]
 
 def get_terrain_by_run_id(run_id):
 	"""returns the terrain of a run with the provided run id. """
 
-	terrain = sqla_session.query(Rating).filter_by(run_id = run_id, question_id = 7).one()
+	terrain = sqla_session.query(RunAnswer.terrain).filter_by(run_id = run_id).one()
 
-	return terrain
+	return terrain[0]
 
 def get_route_by_run_id(run_id):
 	"""returns the route type for a run with the provided run id."""
 
-	route = sqla_session.query(Rating).filter_by(run_id = run_id, question_id = 8).one()
+	route = sqla_session.query(RunAnswer.route_type).filter_by(run_id = run_id).one()
 
-	return route
+	return route[0]
 
 def get_instagram(run_id):
 	"""Returns the instagram html for a given run."""
@@ -312,122 +694,335 @@ def get_instagram(run_id):
 
 	return instagram
 
-def get_location_ratings(user, runs_to_get = 5):
-	""" Returns all ratings that deal with location for a 
-	given user. """
+def get_instagrams(run_ids):
+	"""Returns the instagram html for several runs at once, as a
+	dictionary of run id to html."""
 
-	runs = get_collection_of_runs(user.id, runs_to_get = runs_to_get)
+	if not run_ids:
+		return {}
 
-	location_ratings = []
+	instagrams = sqla_session.query(Rating.run_id, Rating.text_ans).filter(Rating.run_id.in_(run_ids), Rating.question_id == 10).all()
 
-	for run in runs:
-		location_ratings.append(sqla_session.query(Rating).filter_by(question_id = 6, user_id = user.id, run_id = run[3]).one())
-	
+	return dict((run_id, text_ans) for run_id, text_ans in instagrams)
 
-	return location_ratings
+def get_collection_of_runs(user_id, runs_to_get = 5):
 
-def get_terrain_ratings(user, runs_to_get = 5):
-	"""Returns all ratings that deal with location for a given user."""
+	"""Returns the date, distance, score and id of the latest runs 
+	for a given user in one query. Runs saved before the score 
+	column existed get their score from the run answers."""
 
-	runs = get_collection_of_runs(user.id, runs_to_get = runs_to_get)
+	score = func.coalesce(Run.score, calculate_run_score(RunAnswer.during_run, RunAnswer.post_run, RunAnswer.energy))
 
-	terrain_ratings = []
+	runs = sqla_session.query(Run.date_run, Run.approx_dist, score, Run.id).outerjoin(RunAnswer, RunAnswer.run_id == Run.id).filter(Run.user_id == user_id).order_by(Run.date_run.desc()).limit(runs_to_get).all()
 
-	for run in runs:
-		terrain_ratings.append(sqla_session.query(Rating).filter_by(question_id = 7, user_id = user.id, run_id = run[3]).one())
-	
+	# Untuple-ing
+	run_list = []
 
-	return terrain_ratings
+	for run in runs:
+		run_list.append([run[0], run[1], run[2], run[3]])
 
+	return run_list
 
-def get_route_ratings(user, runs_to_get = 5):
-	"""Returns all ratings that deal with route for a given user."""
+def calculate_run_score(during_run, post_run, energy):
+	"""Blends the during, after and energy answers into a single score."""
 
-	runs = get_collection_of_runs(user.id, runs_to_get = runs_to_get)
+	return .50 * during_run + .20 * post_run + .30 * energy
 
-	route_ratings = []
+def get_run_columns(user_id):
+	"""Returns id, date, distance, time, score, the three mood answers,
+	location, terrain and route type for all of a user's runs, newest
+	first, in one query. Used to build the in-memory run cache, so the
+	location, terrain and route type come back as their stored codes."""
 
-	for run in runs:
-		route_ratings.append(sqla_session.query(Rating).filter_by(question_id = 8, user_id = user.id, run_id = run[3]).one())
-	
+	runs = sqla_session.query(Run.id, Run.date_run, Run.approx_dist, Run.approx_time, Run.score, RunAnswer.pre_run, RunAnswer.during_run, RunAnswer.post_run, type_coerce(RunAnswer.location, SmallInteger), type_coerce(RunAnswer.terrain, SmallInteger), type_coerce(RunAnswer.route_type, SmallInteger)).join(RunAnswer, RunAnswer.run_id == Run.id).filter(Run.user_id == user_id).order_by(Run.date_run.desc()).all()
 
-	return route_ratings
+	return runs
 
-def get_collection_of_runs(user_id, runs_to_get = 5):
+def get_daily_distance(user_id, start = None, end = None):
+	"""Returns (day, total distance) pairs for the days a user ran,
+	adding up days with more than one run. start and end are datetimes
+	and either can be left out. Days come back as YYYY-MM-DD strings."""
 
-	"""Returns the date and distance of the latest runs 
-	for a given user. """
+	day = func.date(Run.date_run)
 
-	runs = sqla_session.query(Run.date_run, Run.approx_dist, Run.id).filter_by(user_id = user_id).order_by(Run.date_run.desc()).limit(runs_to_get).all()
+	days = sqla_session.query(day, func.sum(Run.approx_dist)).filter(Run.user_id == user_id)
 
-	# Untuple-ing
-	run_list = []
+	if start != None:
+		days = days.filter(Run.date_run >= start)
+	if end != None:
+		days = days.filter(Run.date_run < end)
 
-	for run in runs:
-		run_list.append([run[0], run[1], get_run_score(run[2]), run[2]])
+	days = days.group_by(day).all()
 
-	return run_list
+	return days
 
 def get_run_score(run_id):
 	"""Returns a score that will help me rate the quality of the run."""
 
-	during_score = sqla_session.query(Rating.numeric_ans).filter_by(run_id = run_id, question_id = 2).first()
-	after_score = sqla_session.query(Rating.numeric_ans).filter_by(run_id = run_id, question_id = 3).first()
-	energy_score = sqla_session.query(Rating.numeric_ans).filter_by(run_id = run_id, question_id = 4).first()
+	run_score = sqla_session.query(Run.score).filter_by(id = run_id).first()
 
-	run_score = .50 * during_score[0] + .20 * after_score[0] + .30 * energy_score[0]
+	return run_score[0]
 
-	return run_score
+def save_run_answers(run, pre_run, during_run, post_run, energy, feeling, location, terrain, route_type):
+	"""Writes the run answers row that mirrors the ratings for a run.
+	Call it next to the rating inserts/updates; the caller commits."""
 
-def get_before_ratings(user, runs_to_get = 5):
-	"""returns  list of all the user inputted ratings about how they felt before the run."""
-	
-	runs = get_collection_of_runs(user.id, runs_to_get = runs_to_get)
+	answers = sqla_session.query(RunAnswer).filter_by(run_id = run.id).first()
 
-	mood_ratings = []
-	mood_info = []
-	
-	for run in runs:
-		mood_ratings.append(sqla_session.query(Rating).filter_by(run_id = run[3], question_id = 1).one())
+	if answers == None:
+		answers = RunAnswer(run_id = run.id, user_id = run.user_id)
+		sqla_session.add(answers)
 
-	print mood_ratings
-	
-	for mood in mood_ratings:
-		mood_info.append([mood.numeric_ans, mood.run.approx_dist])
+	answers.pre_run = pre_run
+	answers.during_run = during_run
+	answers.post_run = post_run
+	answers.energy = energy
+	answers.feeling = feeling
+	answers.location = location
+	answers.terrain = terrain
+	answers.route_type = route_type
 
-	return mood_info
+	run.score = calculate_run_score(during_run, post_run, energy)
 
-def get_during_ratings(user, runs_to_get = 5):
-	"""return list of all the user inputted ratings about how they felt during the run. """
-	runs = get_collection_of_runs(user.id, runs_to_get = runs_to_get)
+	return answers
 
-	mood_ratings = []
-	mood_info = []
+def calculate_score_key(during_run, post_run, energy):
+	"""Returns ten times the run score as a whole number, which is how
+	run stats are grouped."""
 
-	for run in runs:
-		mood_ratings.append(sqla_session.query(Rating).filter_by(run_id = run[3], question_id = 2).one())
+	return 5 * during_run + 2 * post_run + 3 * energy
+
+def run_stat_values(run, answers):
+	"""Returns the (condition, value) pairs that a run counts towards."""
 
-	for mood in mood_ratings:
-		mood_info.append([mood.numeric_ans, mood.run.approx_dist])
+	return [
+		("all", ""), 
+		("location", answers.location), 
+		("terrain", answers.terrain), 
+		("route_type", answers.route_type), 
+		("weekday", str(run.date_run.weekday()))
+	]
 
-	return mood_info
+def change_run_stats(run, answers, change):
+	"""Adds (change = 1) or takes away (change = -1) a run from the 
+	user's run stats. The caller commits."""
 
-def get_after_ratings(user, runs_to_get = 5):
-	"""returns list of all the user inputted ratings about how they felt after the run."""
+	key = calculate_score_key(answers.during_run, answers.post_run, answers.energy)
+	distance = run.approx_dist or 0.0
 
-	runs = get_collection_of_runs(user.id, runs_to_get = runs_to_get)
+	# Stat rows added earlier in this session have to be in the database
+	# before we look for them. 
+	sqla_session.flush()
 
-	mood_ratings = []
+	stats = {}
+	for stat in sqla_session.query(RunStat).filter_by(user_id = run.user_id, score_key = key).all():
+		stats[(stat.condition, stat.value)] = stat
+
+	for condition, value in run_stat_values(run, answers):
+		stat = stats.get((condition, value))
+		if stat == None:
+			stat = RunStat(user_id = run.user_id, score_key = key, condition = condition, value = value, run_count = 0, distance_sum = 0.0)
+			sqla_session.add(stat)
+		stat.run_count = stat.run_count + change
+		stat.distance_sum = stat.distance_sum + change * distance
+
+def add_run_stats(run, answers):
+	"""Counts a new or edited run in the user's run stats."""
+
+	change_run_stats(run, answers, 1)
+
+def remove_run_stats(run):
+	"""Takes a run out of the user's run stats before it is edited.
+	Runs without answers were never counted, so they are skipped."""
+
+	answers = sqla_session.query(RunAnswer).filter_by(run_id = run.id).first()
+
+	if answers != None:
+		change_run_stats(run, answers, -1)
+
+def rebuild_run_stats(user_id = None):
+	"""Throws away the run stats and recounts them from every run
+	and its answers in one pass, for one user or for everyone."""
+
+	stats_query = sqla_session.query(RunStat)
+	# Plain rows rather than objects, since there can be a lot of runs.
+	runs_query = sqla_session.query(Run.user_id, Run.date_run, Run.approx_dist, RunAnswer.during_run, RunAnswer.post_run, RunAnswer.energy, RunAnswer.location, RunAnswer.terrain, RunAnswer.route_type).join(RunAnswer, RunAnswer.run_id == Run.id)
+
+	if user_id != None:
+		stats_query = stats_query.filter(RunStat.user_id == user_id)
+		runs_query = runs_query.filter(Run.user_id == user_id)
+
+	stats_query.delete(synchronize_session = False)
+
+	stats = {}
+
+	for run in runs_query.all():
+		key = calculate_score_key(run.during_run, run.post_run, run.energy)
+		for condition, value in run_stat_values(run, run):
+			stat = stats.get((run.user_id, key, condition, value))
+			if stat == None:
+				stat = RunStat(user_id = run.user_id, score_key = key, condition = condition, value = value, run_count = 0, distance_sum = 0.0)
+				stats[(run.user_id, key, condition, value)] = stat
+			stat.run_count = stat.run_count + 1
+			stat.distance_sum = stat.distance_sum + (run.approx_dist or 0.0)
+
+	sqla_session.add_all(stats.values())
+	sqla_session.commit()
+
+	return len(stats)
+
+def get_ideal_run_stats(user_id):
+	"""Works out the user's highly rated runs from the run stats.
+	A run is highly rated when its score is at least halfway between
+	the average and the best score. Returns a dictionary with the run
+	counts, distances and condition counts of those runs."""
+
+	stats = sqla_session.query(RunStat).filter(RunStat.user_id == user_id, RunStat.run_count > 0).all()
+
+	run_count = 0
+	distance_sum = 0.0
+	key_sum = 0
+	max_key = 0
+
+	for stat in stats:
+		if stat.condition == "all":
+			run_count = run_count + stat.run_count
+			distance_sum = distance_sum + stat.distance_sum
+			key_sum = key_sum + stat.score_key * stat.run_count
+			if stat.score_key > max_key:
+				max_key = stat.score_key
+
+	ideal_stats = {"run_count": run_count, "distance_sum": distance_sum, "high_run_count": 0, "high_distance_sum": 0.0}
+	for condition in ["location", "terrain", "route_type", "weekday"]:
+		ideal_stats[condition] = {}
+
+	if run_count == 0:
+		return ideal_stats
+
+	for stat in stats:
+		# score >= (max score + average score) / 2, multiplied out so 
+		# it stays in whole numbers. 
+		if 2 * stat.score_key * run_count < max_key * run_count + key_sum:
+			continue
+		if stat.condition == "all":
+			ideal_stats["high_run_count"] = ideal_stats["high_run_count"] + stat.run_count
+			ideal_stats["high_distance_sum"] = ideal_stats["high_distance_sum"] + stat.distance_sum
+		else:
+			counts = ideal_stats[stat.condition]
+			counts[stat.value] = counts.get(stat.value, 0) + stat.run_count
+
+	return ideal_stats
+
+# Which run answers column each question id is copied into.
+answer_columns = {
+	1: "pre_run", 
+	2: "during_run", 
+	3: "post_run", 
+	4: "energy", 
+	5: "feeling", 
+	6: "location", 
+	7: "terrain", 
+	8: "route_type"
+}
+
+def reserve_next_id(table):
+	"""Returns the id after the largest one in a table, for bulk inserts
+	that hand out their own ids. The ids from there on are kept for this
+	transaction until it commits or rolls back."""
+
+	connection = sqla_session.connection(bind = ENGINE)
+
+	# An update that changes nothing still takes SQLite's write lock, the
+	# same as BEGIN IMMEDIATE, and keeps it until the commit. So nobody
+	# else can insert between reading the largest id and using the ones
+	# after it, like another import or someone adding a run.
+	connection.execute(table.update().where(table.c.id == 0).values(id = table.c.id))
+
+	return (connection.execute(select([func.max(table.c.id)])).scalar() or 0) + 1
+
+def bulk_insert_runs(runs):
+	"""Inserts many runs at once with their ratings and run answers,
+	using one executemany per table instead of an object per row. Each
+	run is a dictionary with user_id, date_run, zipcode, distance, 
+	duration, route, the eight answers, thoughts and instagram_embed,
+	and optionally commit_date (now if it isn't there).
+	The runs get their ids here so the ratings can point at them. Run 
+	stats, milestone candidates and the data version are left to the
+	caller, who also commits. Returns the new run ids."""
+
+	if not runs:
+		return []
+
+	run_id = reserve_next_id(Run.__table__)
+	commit_date = datetime.now()
+
+	run_rows = []
+	rating_rows = []
+	answer_rows = []
 
 	for run in runs:
-		mood_ratings.append(sqla_session.query(Rating).filter_by(run_id = run[3], question_id = 3).one())
-	
-	mood_info = []
+		run_rows.append({"id": run_id, "user_id": run["user_id"], "date_run": run["date_run"], "zipcode": run.get("zipcode"), "approx_dist": run["distance"], "approx_time": run["duration"], "commit_date": run.get("commit_date") or commit_date, "route": run.get("route"), "score": calculate_run_score(run["during_run"], run["post_run"], run["energy"])})
+
+		answer_row = {"run_id": run_id, "user_id": run["user_id"]}
+		for question_id, column in answer_columns.items():
+			answer_row[column] = run.get(column)
+			rating_row = {"user_id": run["user_id"], "run_id": run_id, "question_id": question_id, "numeric_ans": None, "select_ans": None, "text_ans": None}
+			if question_id <= 4:
+				rating_row["numeric_ans"] = run.get(column)
+			else:
+				rating_row["select_ans"] = run.get(column)
+			rating_rows.append(rating_row)
+		answer_rows.append(answer_row)
 
-	for mood in mood_ratings:
-		mood_info.append([mood.numeric_ans, mood.run.approx_dist])
+		rating_rows.append({"user_id": run["user_id"], "run_id": run_id, "question_id": 9, "numeric_ans": None, "select_ans": None, "text_ans": run.get("thoughts")})
+		rating_rows.append({"user_id": run["user_id"], "run_id": run_id, "question_id": 10, "numeric_ans": None, "select_ans": None, "text_ans": run.get("instagram_embed") or "<p></p>"})
 
-	return mood_info
+		run_id = run_id + 1
+
+	sqla_session.execute(Run.__table__.insert(), run_rows)
+	sqla_session.execute(Rating.__table__.insert(), rating_rows)
+	sqla_session.execute(RunAnswer.__table__.insert(), answer_rows)
+
+	return [row["id"] for row in run_rows]
+
+def backfill_run_answers():
+	"""Builds run answers rows for any run that has ratings but
+	no answers row yet. Reads the ratings table in a single pass."""
+
+	answered = set(row[0] for row in sqla_session.query(RunAnswer.run_id).all())
+
+	ratings = sqla_session.query(Rating.run_id, Rating.user_id, Rating.question_id, Rating.numeric_ans, Rating.select_ans).filter(Rating.question_id.in_(answer_columns.keys())).order_by(Rating.run_id).all()
+
+	new_answers = {}
+
+	for rating in ratings:
+		run_id = rating[0]
+		if run_id in answered:
+			continue
+		if new_answers.get(run_id) == None:
+			new_answers[run_id] = RunAnswer(run_id = run_id, user_id = rating[1])
+		if rating[2] <= 4:
+			setattr(new_answers[run_id], answer_columns[rating[2]], rating[3])
+		else:
+			setattr(new_answers[run_id], answer_columns[rating[2]], rating[4])
+
+	sqla_session.add_all(new_answers.values())
+	sqla_session.commit()
+
+	return len(new_answers)
+
+def backfill_run_scores():
+	"""Stores the score on every run that doesn't have one yet, 
+	computed from its run answers in a single update."""
+
+	answers = RunAnswer.__table__
+	runs = Run.__table__
+
+	score = select([calculate_run_score(answers.c.during_run, answers.c.post_run, answers.c.energy)]).where(answers.c.run_id == runs.c.id).as_scalar()
+
+	result = ENGINE.execute(runs.update().where(runs.c.score == None).values(score = score))
+
+	return result.rowcount
 
 def get_user_routes(user):
 	"""returns all the route objects for the given user. """
@@ -442,12 +1037,225 @@ def get_route_by_id(route_id):
 	route = sqla_session.query(Route).filter_by(id=route_id).one()
 
 	return route
+
+def get_catalog_races(distance, min_date, max_date, zipcode, radius = None):
+	"""Returns the races in the catalog of the given distance between 
+	the two dates, soonest first, that are near the zipcode (see 
+	races_near)."""
+
+	min_date = datetime.combine(min_date, datetime.min.time())
+	max_date = datetime.combine(max_date, datetime.max.time())
+
+	location = None
+	if radius != None:
+		location = zipgeo.locate(zipcode)
+
+	races = sqla_session.query(Race).filter(Race.distance == distance, Race.event_date >= min_date, Race.event_date <= max_date)
+
+	if location == None:
+		return races.filter(Race.zip_prefix == str(zipcode)[:3]).order_by(Race.event_date, Race.id).all()
+
+	# The box gets the races that might be close enough, then races_near
+	# checks how far away each one really is.
+	min_latitude, max_latitude, min_longitude, max_longitude = zipgeo.bounding_box(location[0], location[1], radius)
+
+	races = races.filter(Race.latitude.between(min_latitude, max_latitude), Race.longitude.between(min_longitude, max_longitude)).order_by(Race.event_date, Race.id).all()
+
+	return races_near(races, zipcode, radius)
+
+def races_near(races, zipcode, radius = None):
+	"""Keeps the races within radius miles of the zipcode. If there's no
+	radius or we don't know where the zipcode is, keeps the races whose
+	zipcode starts like the given one instead. The race search runs 
+	both the catalog and active.com's answers through this, so they 
+	agree."""
+
+	location = None
+	if radius != None:
+		location = zipgeo.locate(zipcode)
+
+	if location == None:
+		return [race for race in races if race.zip_prefix == str(zipcode)[:3]]
+
+	return [race for race in races if race.latitude != None and race.longitude != None and zipgeo.haversine(location[0], location[1], race.latitude, race.longitude) <= radius]
+
+def save_races(distance, results):
+	"""Adds active.com results for a distance to the catalog, or updates
+	the ones already there for that distance. Results without an id or a
+	date are skipped. The caller commits."""
+
+	updated_date = datetime.now()
+	results_by_id = {}
+
+	for result in results:
+		id_for_api = result.get("assetGuid")
+		event_date = parse_race_date(result.get("activityStartDate"))
+		if id_for_api and event_date:
+			results_by_id[id_for_api] = (result, event_date)
+
+	if not results_by_id:
+		return []
+
+	existing = {}
+	for race in sqla_session.query(Race).filter(Race.id_for_api.in_(results_by_id.keys()), Race.distance == distance).all():
+		existing[race.id_for_api] = race
+
+	races = []
+
+	for id_for_api, (result, event_date) in results_by_id.items():
+		race = existing.get(id_for_api)
+		if race == None:
+			race = Race(id_for_api = id_for_api, distance = distance)
+			sqla_session.add(race)
+
+		place = result.get("place") or {}
+		zipcode = place.get("postalCode") or ""
+		location = race_location(place, zipcode)
+
+		race.name = result.get("assetName")
+		race.url = result.get("homePageUrlAdr")
+		race.event_date = event_date
+		race.zipcode = zipcode
+		race.zip_prefix = zipcode[:3]
+		race.latitude = location[0]
+		race.longitude = location[1]
+		race.raw = json.dumps(result)
+		race.updated_date = updated_date
+		races.append(race)
+
+	return races
+
+def race_location(place, zipcode):
+	"""Returns (latitude, longitude) for a race from the place active.com
+	gave, or from the centroid of its zipcode, or (None, None)."""
+
+	try:
+		return float(place["latitude"]), float(place["longitude"])
+	except (KeyError, TypeError, ValueError):
+		pass
+
+	return zipgeo.locate(zipcode) or (None, None)
+
+def parse_race_date(date_string):
+	"""Turns an active.com date like 2015-06-01T08:00:00 into a datetime."""
+
+	if not date_string:
+		return None
+
+	try:
+		return datetime.strptime(date_string[:19], "%Y-%m-%dT%H:%M:%S")
+	except ValueError:
+		return None
+
+def remove_past_races(before_date):
+	"""Removes races from the catalog that happened before the date. The
+	caller commits."""
+
+	return sqla_session.query(Race).filter(Race.event_date < before_date).delete(synchronize_session = False)
+
+def get_user_zipcodes():
+	"""Returns every zipcode that users have signed up with."""
+
+	zipcodes = sqla_session.query(User.zipcode).filter(User.zipcode != None).distinct().all()
+
+	return [zipcode[0] for zipcode in zipcodes if zipcode[0]]
 	
 def create_db():
 	"""Recreates the database."""
 
 	Base.metadata.create_all(ENGINE)
 
+def migrate_db():
+	"""Brings an existing database up to date with the current
+	schema and fills in the derived tables."""
+
+	Base.metadata.create_all(ENGINE)
+	add_missing_columns()
+	recode_run_answers()
+	drop_old_indexes()
+	add_missing_indexes()
+	backfill_run_answers()
+	backfill_run_scores()
+	rebuild_run_stats()
+
+	# milestones builds on the run cache, which imports this file. 
+	import milestones
+	for user in sqla_session.query(User).all():
+		milestones.rebuild_milestone_candidates(user)
+
+def add_missing_columns():
+	"""Adds columns that were added to the classes after the
+	tables were first created. SQLite can only add columns, so
+	that is all this does."""
+
+	inspector = inspect(ENGINE)
+
+	for table in Base.metadata.sorted_tables:
+		existing = set(column["name"] for column in inspector.get_columns(table.name))
+		for column in table.columns:
+			if column.name not in existing:
+				column_type = column.type.compile(dialect = ENGINE.dialect)
+				ENGINE.execute("ALTER TABLE %s ADD COLUMN %s %s" % (table.name, column.name, column_type))
+
+def recode_run_answers():
+	"""Turns the location, terrain and route type in run_answers from
+	text into codes, for databases from before they were stored as 
+	numbers. SQLite can't change a column's type, so the answers are 
+	copied into a new table. Anything that isn't one of the choices is
+	left empty."""
+
+	inspector = inspect(ENGINE)
+	columns = dict((column["name"], column["type"]) for column in inspector.get_columns("run_answers"))
+
+	if isinstance(columns["location"], Integer):
+		return
+
+	ENGINE.execute("ALTER TABLE run_answers RENAME TO run_answers_text")
+	RunAnswer.__table__.create(ENGINE)
+
+	old = Table("run_answers_text", MetaData(), autoload = True, autoload_with = ENGINE)
+	answers = RunAnswer.__table__
+
+	recoded = []
+	for column in answers.columns:
+		choices = getattr(column.type, "choices", None)
+		if choices == None:
+			recoded.append(old.c[column.name])
+		else:
+			recoded.append(case(dict((choice, code) for code, choice in enumerate(choices)), value = old.c[column.name]))
+
+	ENGINE.execute(answers.insert().from_select([column.name for column in answers.columns], select(recoded)))
+	ENGINE.execute("DROP TABLE run_answers_text")
+
+# Indexes that have been replaced, as (table, index name). A race used
+# to be unique on its active.com id alone, which left an event with
+# several distances under just one of them.
+OLD_INDEXES = [
+	("races", "ix_races_id_for_api"),
+]
+
+def drop_old_indexes():
+	"""Drops the indexes in OLD_INDEXES from databases that still have
+	them."""
+
+	inspector = inspect(ENGINE)
+
+	for table_name, index_name in OLD_INDEXES:
+		if table_name in inspector.get_table_names() and index_name in set(index["name"] for index in inspector.get_indexes(table_name)):
+			ENGINE.execute("DROP INDEX %s" % index_name)
+
+def add_missing_indexes():
+	"""Creates indexes that were declared after the tables were 
+	first created. create_all only makes indexes for new tables."""
+
+	inspector = inspect(ENGINE)
+
+	for table in Base.metadata.sorted_tables:
+		existing = set(index["name"] for index in inspector.get_indexes(table.name))
+		for index in table.indexes:
+			if index.name not in existing:
+				index.create(ENGINE)
+
 # Dictionaries, etc. that will be helpful in displaying info
 
 route_dictionary = {
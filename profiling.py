@@ -0,0 +1,245 @@
+# This file profiles requests when we ask it to, for finding out where
+# the time goes on a slow page. It is off unless PROFILING is set, and
+# then it wraps the app in ProfilingMiddleware. When it is off nothing
+# is wrapped, so the app runs exactly as it does without it.
+#
+# A request is profiled when it has an X-Profile header, or at random
+# for PROFILE_SAMPLE_RATE of requests. While it runs, a second thread
+# looks at its stack every PROFILE_INTERVAL seconds. The stacks are
+# written to PROFILE_DIRECTORY as collapsed stacks, one line per stack
+# with how many times it was seen, which flamegraph.pl and speedscope
+# can draw:
+#
+# runfree.py:dashboard;model.py:get_milestone_candidates;query.py:all 12
+#
+# index.json in the same directory lists the slowest requests profiled
+# so far, with their files and the functions in runfree.py and model.py
+# that took the most time. Only the slowest PROFILE_KEEP are kept.
+#
+# PROFILING=1 PROFILE_SAMPLE_RATE=0.01 python runfree.py
+# curl -H "X-Profile: 1" -b cookies.txt localhost:5000/ideal_runs
+
+import os
+import sys
+import json
+import time
+import random
+import thread
+import threading
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PROFILE_DIRECTORY = os.environ.get("PROFILE_DIRECTORY", os.path.join(HERE, "profiles"))
+
+# The share of requests profiled without the header, from 0 to 1.
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+
+# Seconds between looks at the stack.
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", 0.005))
+
+# How many of the slowest requests to keep.
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 20))
+
+# The header that asks for a request to be profiled.
+PROFILE_HEADER = "X-Profile"
+
+# Our files, whose functions get listed in the index.
+APP_FILES = ["runfree.py", "model.py"]
+
+# How many functions to list for each request in the index.
+TOP_FUNCTIONS = 10
+
+
+def frame_name(frame):
+	"""Names a frame like runfree.py:dashboard. Files outside the app
+	get their folder too, like orm/query.py:all."""
+
+	path = os.path.abspath(frame.f_code.co_filename)
+
+	if os.path.dirname(path) == HERE:
+		filename = os.path.basename(path)
+	else:
+		filename = "/".join(path.split(os.sep)[-2:])
+
+	return "%s:%s" % (filename, frame.f_code.co_name)
+
+
+def frame_stack(frame):
+	"""Returns the names of the frames from the outermost call in."""
+
+	stack = []
+	while frame != None:
+		stack.append(frame_name(frame))
+		frame = frame.f_back
+
+	stack.reverse()
+
+	return stack
+
+
+class Sampler(threading.Thread):
+	"""Looks at another thread's stack every interval seconds until
+	stopped, counting how often each stack is seen."""
+
+	def __init__(self, thread_id, interval = None):
+		threading.Thread.__init__(self)
+		self.daemon = True
+		self.thread_id = thread_id
+		self.interval = interval or PROFILE_INTERVAL
+		self.stacks = {}
+		self.samples = 0
+		self.stopped = threading.Event()
+
+	def run(self):
+		while not self.stopped.is_set():
+			frame = sys._current_frames().get(self.thread_id)
+			if frame != None:
+				stack = ";".join(frame_stack(frame))
+				self.stacks[stack] = self.stacks.get(stack, 0) + 1
+				self.samples = self.samples + 1
+			self.stopped.wait(self.interval)
+
+	def stop(self):
+		self.stopped.set()
+		self.join()
+
+	def collapsed(self):
+		"""Returns the stacks as collapsed stack lines, most seen first."""
+
+		counts = sorted(self.stacks.items(), key = lambda item: item[1], reverse = True)
+
+		return ["%s %d" % (stack, count) for stack, count in counts]
+
+	def app_functions(self, elapsed):
+		"""Returns the functions in APP_FILES with the milliseconds spent
+		in them (counting what they call) and on their own lines, most
+		time first."""
+
+		if not self.samples:
+			return []
+
+		milliseconds_per_sample = elapsed * 1000 / self.samples
+		totals = {}
+
+		for stack, count in self.stacks.items():
+			names = stack.split(";")
+			# A recursive function only counts once per stack.
+			for name in set(names):
+				if name.split(":")[0] in APP_FILES:
+					totals.setdefault(name, [0, 0])[0] += count
+			if names[-1].split(":")[0] in APP_FILES:
+				totals[names[-1]][1] += count
+
+		functions = []
+		for name, (total, own) in totals.items():
+			functions.append({"function": name, "total_ms": round(total * milliseconds_per_sample, 3), "own_ms": round(own * milliseconds_per_sample, 3)})
+
+		functions.sort(key = lambda function: function["total_ms"], reverse = True)
+
+		return functions[:TOP_FUNCTIONS]
+
+
+class ProfilingMiddleware(object):
+	"""Profiles the requests that ask for it, or a random share of them,
+	and keeps the slowest in directory."""
+
+	def __init__(self, wsgi_app, directory = None, sample_rate = None, interval = None, keep = None):
+		self.wsgi_app = wsgi_app
+		self.directory = directory or PROFILE_DIRECTORY
+		self.sample_rate = PROFILE_SAMPLE_RATE if sample_rate == None else sample_rate
+		self.interval = interval or PROFILE_INTERVAL
+		self.keep = keep or PROFILE_KEEP
+		self.lock = threading.Lock()
+
+		if not os.path.isdir(self.directory):
+			os.makedirs(self.directory)
+
+		self.index_path = os.path.join(self.directory, "index.json")
+		self.index = []
+		if os.path.exists(self.index_path):
+			with open(self.index_path) as index_file:
+				self.index = json.load(index_file)
+
+	def wanted(self, environ):
+		header = "HTTP_" + PROFILE_HEADER.upper().replace("-", "_")
+
+		if environ.get(header):
+			return True
+
+		return self.sample_rate > 0 and random.random() < self.sample_rate
+
+	def __call__(self, environ, start_response):
+		if not self.wanted(environ):
+			return self.wsgi_app(environ, start_response)
+
+		sampler = Sampler(thread.get_ident(), self.interval)
+		started = time.time()
+		sampler.start()
+
+		# The whole body is read here so the time spent making it is
+		# counted too.
+		app_iter = self.wsgi_app(environ, start_response)
+		try:
+			body = list(app_iter)
+		finally:
+			if hasattr(app_iter, "close"):
+				app_iter.close()
+			sampler.stop()
+
+		self.save(environ, time.time() - started, sampler)
+
+		return body
+
+	def save(self, environ, elapsed, sampler):
+		"""Writes the stacks if the request is one of the slowest so far
+		and updates the index."""
+
+		path = environ.get("PATH_INFO", "")
+		if environ.get("QUERY_STRING"):
+			path = path + "?" + environ["QUERY_STRING"]
+
+		with self.lock:
+			if len(self.index) >= self.keep and elapsed * 1000 <= self.index[-1]["ms"]:
+				return
+
+			now = datetime.now()
+			filename = "%s-%s-%06d.folded" % (now.strftime("%Y%m%d-%H%M%S"), environ.get("PATH_INFO", "").strip("/").replace("/", "_") or "index", now.microsecond)
+
+			with open(os.path.join(self.directory, filename), "w") as stacks_file:
+				for line in sampler.collapsed():
+					stacks_file.write(line + "\n")
+
+			self.index.append({
+				"path": path,
+				"method": environ.get("REQUEST_METHOD"),
+				"date": now.isoformat(),
+				"ms": round(elapsed * 1000, 3),
+				"samples": sampler.samples,
+				"file": filename,
+				"functions": sampler.app_functions(elapsed),
+			})
+			self.index.sort(key = lambda entry: entry["ms"], reverse = True)
+
+			# The requests that aren't among the slowest anymore go.
+			for entry in self.index[self.keep:]:
+				old_path = os.path.join(self.directory, entry["file"])
+				if os.path.exists(old_path):
+					os.remove(old_path)
+			del self.index[self.keep:]
+
+			with open(self.index_path, "w") as index_file:
+				json.dump(self.index, index_file, indent = 2)
+
+
+def init_app(app):
+	"""Wraps the app in ProfilingMiddleware if PROFILING is on. Does
+	nothing otherwise."""
+
+	app.config.setdefault("PROFILING", os.environ.get("PROFILING") == "1")
+
+	if not app.config["PROFILING"]:
+		return
+
+	app.wsgi_app = ProfilingMiddleware(app.wsgi_app)
+	app.logger.info("Profiling requests into %s", app.wsgi_app.directory)
@@ -0,0 +1,243 @@
+# This file checks that the queries in model.py use the indexes.
+# It builds a small throwaway database, calls the model functions
+# while recording every statement they send, and then runs
+# EXPLAIN QUERY PLAN on each one. If any of them has to scan a whole
+# table it prints the plan and exits with an error, so it can be run
+# before deploying: python queryplans.py
+# test_queryplans.py runs the same check with the tests.
+
+import os
+import sys
+import re
+import random
+import shutil
+import tempfile
+import datetime
+
+# model.py opens runfree.db in the working directory, so we move into
+# a scratch directory before importing it, and make sure it isn't
+# pointed at some other database.
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+SCRATCH = tempfile.mkdtemp()
+os.chdir(SCRATCH)
+os.environ["RUNFREE_DATABASE_URL"] = "sqlite:///" + os.path.join(SCRATCH, "runfree.db")
+
+import model
+import seedqs
+import seedruns
+import zipgeo
+from sqlalchemy import event
+
+# Functions that are supposed to read whole tables, like the backfills.
+WHOLE_TABLE_FUNCTIONS = ["backfill_run_answers", "backfill_run_scores", "rebuild_run_stats", "get_user_zipcodes"]
+
+# Small lookup tables where a scan is cheaper than an index.
+SMALL_TABLES = ["questions"]
+
+# A scan that goes through an index in order, without looking anything
+# up in it, still reads every row.
+FULL_SCAN = re.compile(r"^SCAN (TABLE )?(\w+)( USING (COVERING )?INDEX \w+)?$")
+
+
+def build_database():
+	"""Creates a scratch database with one user, some runs and a goal."""
+
+	model.create_db()
+	seedqs.seed(seedqs.questions)
+
+	user = model.User(email="plans@runfree.com", password="plans", zipcode="94577")
+	model.insert_new_user(user)
+
+	for i in range(3):
+		model.sqla_session.add(model.Route(user_id = user.id, title = "Route %d" % i, html_embed = "<p></p>", distance = 3.1))
+	model.sqla_session.commit()
+
+	random.seed(0)
+	seedruns.seedruns(user.id, 25, datetime.datetime(2015, 1, 1, 8, 45), 1)
+
+	goal = model.Goal(user_id = user.id, description = "run_10k", set_date = datetime.datetime(2015, 1, 5), event_date = datetime.datetime(2015, 6, 1))
+	model.insert_new_goal(goal)
+	for subgoal in model.subgoal_dictionary[goal.description]:
+		model.insert_new_subgoal(model.Subgoal(goal_id = goal.id, description = subgoal))
+
+	# Stand in for the zipcode file so the radius search can be checked.
+	zipgeo.centroids.update({"94577": (37.7249, -122.1561)})
+
+	races = []
+	for i in range(5):
+		races.append({"assetGuid": "race-%d" % i, "assetName": "Race %d" % i, "homePageUrlAdr": "http://example.com/%d" % i, "activityStartDate": "2015-0%d-01T08:00:00" % (i + 2), "place": {"postalCode": "94577"}})
+	model.save_races(model.distance_dictionary["run_10k"], races)
+	model.sqla_session.commit()
+
+	return user
+
+
+def run_model_functions(user):
+	"""Calls the model functions that talk to the database. Returns
+	a list of (function name, call) pairs so we know who sent what."""
+
+	run = model.get_latest_run(user)
+	goal = model.get_most_recent_goal(user)
+	subgoal = model.get_subgoals_by_goal_id(goal.id)[0]
+	route = model.get_user_routes(user)[0]
+
+	return [
+		("get_user_by_email", lambda: model.get_user_by_email(user.email)),
+		("get_latest_run", lambda: model.get_latest_run(user)),
+		("get_run_by_id", lambda: model.get_run_by_id(run.id)),
+		("find_all_runs", lambda: model.find_all_runs(user)),
+		("find_all_runs_desc", lambda: model.find_all_runs_desc(user)),
+		("get_runs_page", lambda: model.get_runs_page(user, page_size = 10)),
+		("get_runs_page after a run", lambda: model.get_runs_page(user, page_size = 10, before_date = run.date_run, before_id = run.id)),
+		("get_most_recent_goal", lambda: model.get_most_recent_goal(user)),
+		("get_goal_by_id", lambda: model.get_goal_by_id(goal.id)),
+		("get_subgoals_by_goal_id", lambda: model.get_subgoals_by_goal_id(goal.id)),
+		("get_subgoal_by_id", lambda: model.get_subgoal_by_id(subgoal.id)),
+		("get_all_goals", lambda: model.get_all_goals(user)),
+		("get_outstanding_goals", lambda: model.get_outstanding_goals(user)),
+		("get_outstanding_subgoals", lambda: model.get_outstanding_subgoals(user)),
+		("get_outstanding_subgoal_by_goal_id", lambda: model.get_outstanding_subgoal_by_goal_id(goal.id)),
+		("get_runs_after_date", lambda: model.get_runs_after_date(user, goal.set_date)),
+		("latest_runs_reaching", lambda: model.latest_runs_reaching(user.id, goal.set_date, 6.2, 10, exclude_run_id = run.id)),
+		("record_milestone_candidates", lambda: (model.record_milestone_candidates(run), model.sqla_session.commit())),
+		("record_milestone_candidates for a deleted run", lambda: (model.record_milestone_candidates(run, deleted = True), model.sqla_session.rollback())),
+		("get_milestone_candidates", lambda: model.get_milestone_candidates(user)),
+		("get_milestone_candidates for a goal", lambda: model.get_milestone_candidates(user, goal_id = goal.id)),
+		("clear_milestone_candidates", lambda: (model.clear_milestone_candidates(subgoal_id = subgoal.id), model.clear_milestone_candidates(goal_id = goal.id), model.sqla_session.commit())),
+		("get_ratings_for_run", lambda: model.get_ratings_for_run(run.id)),
+		("get_answers_by_run_id", lambda: model.get_answers_by_run_id(run.id)),
+		("get_location_by_run_id", lambda: model.get_location_by_run_id(run.id)),
+		("get_terrain_by_run_id", lambda: model.get_terrain_by_run_id(run.id)),
+		("get_route_by_run_id", lambda: model.get_route_by_run_id(run.id)),
+		("get_instagram", lambda: model.get_instagram(run.id)),
+		("get_instagrams", lambda: model.get_instagrams([run.id])),
+		("get_collection_of_runs", lambda: model.get_collection_of_runs(user.id, runs_to_get = 10)),
+		("get_run_columns", lambda: model.get_run_columns(user.id)),
+		("get_data_version", lambda: model.get_data_version(user.id)),
+		("bump_data_version", lambda: (model.bump_data_version(user.id), model.sqla_session.commit())),
+		("get_daily_distance", lambda: model.get_daily_distance(user.id, start = datetime.datetime(2015, 1, 1), end = datetime.datetime(2015, 2, 1))),
+		("get_run_score", lambda: model.get_run_score(run.id)),
+		("get_user_routes", lambda: model.get_user_routes(user)),
+		("get_route_by_id", lambda: model.get_route_by_id(route.id)),
+		("save_run_answers", lambda: (model.save_run_answers(run, 3, 4, 5, 4, "positive", "park", "flat", "loop"), model.sqla_session.commit())),
+		("remove_run_stats", lambda: (model.remove_run_stats(run), model.sqla_session.commit())),
+		("add_run_stats", lambda: (model.add_run_stats(run, model.get_answers_by_run_id(run.id)), model.sqla_session.commit())),
+		("bulk_insert_runs", lambda: (model.bulk_insert_runs([{"user_id": user.id, "date_run": datetime.datetime(2015, 3, 1, 7, 30), "distance": 3.1, "duration": 30, "pre_run": 3, "during_run": 4, "post_run": 5, "energy": 4, "location": "park", "terrain": "flat", "route_type": "loop"}]), model.sqla_session.commit())),
+		("rebuild_run_stats for a user", lambda: model.rebuild_run_stats(user.id)),
+		("get_ideal_run_stats", lambda: model.get_ideal_run_stats(user.id)),
+		("get_catalog_races", lambda: model.get_catalog_races(model.distance_dictionary["run_10k"], datetime.date(2015, 1, 1), datetime.date(2015, 6, 1), "94577")),
+		("get_catalog_races within a radius", lambda: model.get_catalog_races(model.distance_dictionary["run_10k"], datetime.date(2015, 1, 1), datetime.date(2015, 6, 1), "94577", radius = 25)),
+		("save_races", lambda: (model.save_races(model.distance_dictionary["run_10k"], [{"assetGuid": "race-1", "activityStartDate": "2015-03-01T09:00:00"}]), model.sqla_session.commit())),
+		("remove_past_races", lambda: (model.remove_past_races(datetime.datetime(2015, 2, 15)), model.sqla_session.commit())),
+		("get_user_zipcodes", model.get_user_zipcodes),
+		("backfill_run_answers", model.backfill_run_answers),
+		("backfill_run_scores", model.backfill_run_scores),
+		("rebuild_run_stats", model.rebuild_run_stats),
+	]
+
+
+def capture_statements(calls):
+	"""Runs each call and records the statements it sends to the database."""
+
+	captured = []
+	current = [None]
+
+	def record(conn, cursor, statement, parameters, context, executemany):
+		captured.append((current[0], statement, parameters))
+
+	event.listen(model.ENGINE, "before_cursor_execute", record)
+
+	for name, call in calls:
+		current[0] = name
+		call()
+		# Start each function with an empty identity map so lazy loads
+		# show up under the function that triggers them.
+		model.sqla_session.expire_all()
+
+	event.remove(model.ENGINE, "before_cursor_execute", record)
+
+	return captured
+
+
+def full_scans(statement, parameters):
+	"""Returns the tables that a statement reads from start to finish."""
+
+	plan = model.ENGINE.execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+
+	return scans_in_plan([list(row)[-1] for row in plan])
+
+
+def scans_in_plan(details):
+	"""Returns the lines of a query plan that read a whole table. A scan
+	in index order only counts when nothing in the plan is looked up
+	with an index, since then the scan is the whole query."""
+
+	searches = [detail for detail in details if detail.startswith("SEARCH")]
+	scans = []
+
+	for detail in details:
+		match = FULL_SCAN.match(detail)
+		if not match or match.group(2) in SMALL_TABLES:
+			continue
+		if match.group(3) and searches:
+			continue
+		scans.append(detail)
+
+	return scans
+
+
+def find_full_scans():
+	"""Builds the scratch database, runs the model functions and checks
+	the plan of every query they sent. Returns (the statements checked,
+	[(function name, statement, scans)] for the ones that scan a whole
+	table)."""
+
+	user = build_database()
+	captured = capture_statements(run_model_functions(user))
+
+	checked = set()
+	failures = []
+
+	for name, statement, parameters in captured:
+		if name in WHOLE_TABLE_FUNCTIONS:
+			continue
+		if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+			continue
+		if statement in checked:
+			continue
+		checked.add(statement)
+
+		scans = full_scans(statement, parameters)
+		if scans:
+			failures.append((name, statement, scans))
+
+	return checked, failures
+
+
+def clean_up():
+	"""Closes the session and removes the scratch database."""
+
+	model.sqla_session.remove()
+	shutil.rmtree(SCRATCH, ignore_errors = True)
+
+
+def main():
+
+	checked, failures = find_full_scans()
+
+	for name, statement, scans in failures:
+		print "%s does a full table scan: %s" % (name, ", ".join(scans))
+		print statement
+		print
+
+	print "Checked %d queries, %d full table scans." % (len(checked), len(failures))
+
+	clean_up()
+
+	if failures:
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,62 @@
+# This file keeps the JSON the chart routes send, so coming back to the
+# graph page doesn't work everything out again. A response is kept
+# under the user, the endpoint, the query string arguments and the
+# user's data version. Saving a run, goal or route bumps the version,
+# so the next request misses and the old responses are left to fall
+# out of the cache as newer ones push them out.
+#
+# A hit costs the one query for the data version, which is what keeps
+# this right when another process saved the change.
+
+import os
+import functools
+import model
+import metrics
+from flask import request, g
+from lrucache import LRUCache
+
+# The number of responses kept in memory at once.
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 2048))
+
+# Responses bigger than this many characters aren't kept, so one
+# user's whole history can't crowd out everyone else.
+RESPONSE_CACHE_MAX_LENGTH = int(os.environ.get("RESPONSE_CACHE_MAX_LENGTH", 262144))
+
+cache = LRUCache(RESPONSE_CACHE_SIZE)
+
+
+def response_key(user_id, version):
+	"""The key for the current request's response."""
+
+	arguments = tuple(sorted(request.args.items(multi = True)))
+
+	return (user_id, request.endpoint, arguments, version)
+
+
+def cached(view):
+	"""Keeps what a view returns for the signed in user until their data
+	version changes. Only plain strings are kept, so a redirect or an
+	error is always worked out again."""
+
+	@functools.wraps(view)
+	def cached_view(*args, **kwargs):
+		if g.user == None:
+			return view(*args, **kwargs)
+
+		key = response_key(g.user.id, model.get_data_version(g.user.id))
+
+		response = cache.get(key)
+		if response != None:
+			metrics.response_cache_lookups.inc((request.endpoint, "hit"))
+			return response
+
+		metrics.response_cache_lookups.inc((request.endpoint, "miss"))
+
+		response = view(*args, **kwargs)
+
+		if isinstance(response, basestring) and len(response) <= RESPONSE_CACHE_MAX_LENGTH:
+			cache.set(key, response)
+
+		return response
+
+	return cached_view
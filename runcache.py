@@ -0,0 +1,88 @@
+# This file keeps each user's runs in memory as numpy arrays, one
+# array per column, so the chart routes can slice and count them
+# without building a Run object for every row. A user's arrays are
+# built with one query and thrown away when the user's data version
+# changes, which saving a run, goal or route bumps.
+
+import os
+import numpy
+import model
+from lrucache import LRUCache
+
+# The number of users whose runs are kept in memory at once.
+RUN_CACHE_SIZE = int(os.environ.get("RUN_CACHE_SIZE", 256))
+
+# Every array in a UserRuns, in the same order as model.get_run_columns.
+COLUMNS = ["ids", "dates", "distances", "durations", "scores", "pre_run", "during_run", "post_run", "locations", "terrains", "route_types"]
+
+
+def coded(codes, choices):
+	"""Turns the codes the database stores for a list of choices into 
+	(names, codes), where names is the choices with an empty name on the
+	end for runs that didn't answer and codes is an array of indexes
+	into it."""
+
+	names = choices + [u""]
+	codes = numpy.array([len(choices) if code == None else code for code in codes], dtype = numpy.int64)
+
+	return names, codes
+
+
+class UserRuns(object):
+	"""The runs of one user as parallel arrays, newest run first.
+	Locations, terrains and route types are stored as codes that index
+	into location_names, terrain_names and route_type_names."""
+
+	def __init__(self, version, rows):
+		self.version = version
+
+		self.ids = numpy.array([row[0] for row in rows], dtype = numpy.int64)
+		self.dates = numpy.array([row[1] for row in rows], dtype = "datetime64[s]")
+		self.distances = numpy.array([row[2] for row in rows], dtype = float)
+		self.durations = numpy.array([row[3] for row in rows], dtype = float)
+		self.scores = numpy.array([row[4] for row in rows], dtype = float)
+		self.pre_run = numpy.array([row[5] for row in rows], dtype = numpy.int64)
+		self.during_run = numpy.array([row[6] for row in rows], dtype = numpy.int64)
+		self.post_run = numpy.array([row[7] for row in rows], dtype = numpy.int64)
+
+		self.location_names, self.locations = coded([row[8] for row in rows], model.location_codes)
+		self.terrain_names, self.terrains = coded([row[9] for row in rows], model.terrain_codes)
+		self.route_type_names, self.route_types = coded([row[10] for row in rows], model.route_codes)
+
+	def __len__(self):
+		return len(self.ids)
+
+	def window(self, number_of_runs):
+		"""Returns the latest number_of_runs runs as a new UserRuns. The
+		arrays are views into this one, so nothing is copied. None means
+		all of them."""
+
+		if number_of_runs != None:
+			number_of_runs = int(number_of_runs)
+
+		latest = UserRuns.__new__(UserRuns)
+		latest.__dict__.update(self.__dict__)
+
+		for column in COLUMNS:
+			setattr(latest, column, getattr(self, column)[:number_of_runs])
+
+		return latest
+
+
+# user id -> UserRuns
+cache = LRUCache(RUN_CACHE_SIZE)
+
+
+def get_user_runs(user_id):
+	"""Returns the cached runs for a user, rebuilding them if the user's
+	data has changed since they were cached."""
+
+	version = model.get_data_version(user_id)
+
+	user_runs = cache.get(user_id)
+
+	if user_runs == None or user_runs.version != version:
+		user_runs = UserRuns(version, model.get_run_columns(user_id))
+		cache.set(user_id, user_runs)
+
+	return user_runs
@@ -1,14 +1,23 @@
 # This is the controller file. All of my routes for my flask app
 # will go here. 
 
-from flask import Flask, request, render_template, g, redirect, url_for, flash, jsonify
+from flask import Flask, Response, request, render_template, g, redirect, url_for, flash, jsonify
 from flask import session as flask_session
 import model
 import jinja2
 import os
 from datetime import datetime, date, timedelta
 import goals
-import requests
+import runcache
+import analytics
+import activeclient
+import runimport
+import sqlstats
+import profiling
+import metrics
+import usercache
+import responsecache
+import zipgeo
 import json
 from math import ceil
 import time
@@ -22,9 +31,62 @@ app = Flask(__name__)
 app.secret_key = "THISISMYPRODUCTIONANDTESTINGKEY"
 app.jinja_env.undefined = jinja2.StrictUndefined
 
+# Counts the SQL statements each request sends. See sqlstats.py.
+sqlstats.init_app(app, model.ENGINE, model.READ_ENGINE)
+
+# Profiles slow requests when PROFILING is set. See profiling.py.
+profiling.init_app(app)
+
+# Request counts and timings for /metrics. See metrics.py.
+metrics.init_app(app)
+
+# Won't start without the zipcode file if ZIP_CENTROIDS_REQUIRED is set.
+# See zipgeo.py.
+zipgeo.check_centroids()
+
+# GET requests read over read only connections, except for these, which
+# save things even though they're GETs.
+WRITE_ENDPOINTS = set(["update_goal", "race_search"])
+
+@app.before_request
+def choose_database():
+	model.use_read_engine(request.method == "GET" and request.endpoint not in WRITE_ENDPOINTS)
+
+@app.before_request
+def load_user():
+	"""Finds the signed in user, if there is one, for g.user. Sessions
+	from before the user id was kept in them are looked up by email 
+	once and then get the id."""
+
+	g.user = None
+
+	if flask_session.get("user_id") != None:
+		g.user = usercache.get_user(flask_session["user_id"])
+	elif flask_session.get("email") != None:
+		user = model.get_user_by_email(flask_session["email"])
+		if user != None:
+			flask_session["user_id"] = user.id
+			g.user = user
+
+@app.teardown_request
+def remove_session(exception = None):
+	"""Hands the request's connection back to the pool, so the next 
+	request starts with a fresh session."""
+	model.sqla_session.remove()
+
 # API keys
 
-ACTIVEDOTCOM_KEY= os.environ["ACTIVEDOTCOM_KEY"]
+# The active.com key and race search settings live in activeclient.py.
+
+# Race search, in miles from the zipcode. The new goal form offers these.
+
+RACE_SEARCH_RADIUS = 25
+RACE_SEARCH_RADII = [10, 25, 50, 100]
+
+# Run log paging
+
+RUN_LOG_PAGE_SIZE = 25
+RUN_LOG_MAX_PAGE_SIZE = 100
 
 
 # Routes Begin Here
@@ -79,8 +141,9 @@ def authenticate_user():
 
 		return redirect("/")
 	
-	# adds email to session. Redirects to run_log. 
-	flask_session["email"] = model.get_user_by_email(email).email
+	# adds email and user id to session. Redirects to run_log. 
+	flask_session["email"] = user.email
+	flask_session["user_id"] = user.id
 	flash("Successfully logged in!")
 
 	return redirect("/user_landing")
@@ -131,8 +194,9 @@ def insert_user():
 	# Adding the user to the database. 
 	model.insert_new_user(new_user)
 
-	# storing their email in the session. 
+	# storing their email and user id in the session. 
 	flask_session["email"] = email
+	flask_session["user_id"] = new_user.id
 
 	return redirect("/user_landing")
 
@@ -150,80 +214,137 @@ def dashboard():
 		flash("You must sign in to view that page.")
 		return redirect("/")
 
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 	
 
-	runs = model.get_collection_of_runs(user.id, runs_to_get = 4)
+	# Looks at the last 8 runs in one go rather than asking for each
+	# run's instagram separately, and keeps the newest ones.
+	runs = model.get_collection_of_runs(user.id, runs_to_get = 8)
+	run_instagrams = model.get_instagrams([run[3] for run in runs])
 	instagrams = []
 	for run in runs:
-		instagram = model.get_instagram(run[3])
-		if len(instagram[0].text_ans) > 20:
-			instagrams.append(instagram[0].text_ans)
-
-	#looks for more instagrams if the first search didn't return very many
-	if len(instagrams) < 4:
-		instagrams = []
-		runs = model.get_collection_of_runs(user.id, runs_to_get = 8)
-		for run in runs:
-			instagram = model.get_instagram(run[3])
-			if len(instagram[0].text_ans) > 20:
-				instagrams.append(instagram[0].text_ans)
+		instagram = run_instagrams.get(run[3]) or ""
+		if len(instagram) > 20:
+			instagrams.append(instagram)
 
 	if len(instagrams) > 4:
 		instagrams = instagrams[:4]
 
 
-	#gets outstanding subgoals 
+	#gets the runs that look like they meet outstanding subgoals and goals. 
+	# These are worked out when runs are saved. 
 
-	outstanding_subgoals = model.get_outstanding_subgoals(user)
+	subgoal_candidates, goal_candidates = model.get_milestone_candidates(user)
 
-	possible_matches = []
+	possible_matches = [(candidate.subgoal, candidate.run) for candidate in subgoal_candidates]
+	possible_goal_matches = [(candidate.goal, candidate.run) for candidate in goal_candidates]
 
-	for subgoal in outstanding_subgoals:
-		runs_after_date = model.get_runs_after_date(user, subgoal.goal.set_date)
-		for run in runs_after_date:
-			if run.approx_dist >= model.distance_int_dictionary[subgoal.description]:
-				possible_matches.append((subgoal, run))
+	# The page variable determines which tabs are active.
+	page = "user_landing"	
 
-	# gets outstanding goals
+	return render_template("user_landing.html", instagrams=instagrams, possible_matches = possible_matches, possible_goal_matches = possible_goal_matches, goal_dictionary = model.goal_dictionary, page = page)
+	
+def get_run_log_page(user):
+	"""Looks up the page of the run log asked for by the cursor and 
+	page_size arguments. The cursor is the date and id of the last run
+	on the previous page, so each page is found with the index instead
+	of counting past the runs before it. Returns the runs and the cursor
+	for the next page, which is None on the last page."""
 
-	outstanding_goals = model.get_outstanding_goals(user)
+	page_size = request.args.get("page_size", RUN_LOG_PAGE_SIZE, type = int)
+	page_size = max(1, min(page_size, RUN_LOG_MAX_PAGE_SIZE))
 
-	possible_goal_matches = []
+	before_date = None
+	before_id = None
 
-	for goal in outstanding_goals:
-		for run in runs_after_date:
-			if run.approx_dist >= model.distance_int_dictionary[goal.description]:
-				possible_goal_matches.append((goal, run))
+	cursor = request.args.get("cursor")
 
+	# A cursor we can't read starts back at the newest run. 
+	if cursor:
+		try:
+			before_date, before_id = cursor.split("_")
+			before_date = datetime.strptime(before_date, "%Y-%m-%dT%H:%M:%S.%f")
+			before_id = int(before_id)
+		except ValueError:
+			before_date = None
+			before_id = None
 
+	runs, more_runs = model.get_runs_page(user, page_size = page_size, before_date = before_date, before_id = before_id)
 
+	next_cursor = None
 
-	# The page variable determines which tabs are active.
-	page = "user_landing"	
+	if more_runs:
+		next_cursor = runs[-1].date_run.strftime("%Y-%m-%dT%H:%M:%S.%f") + "_" + str(runs[-1].id)
+
+	return runs, next_cursor
 
-	return render_template("user_landing.html", instagrams=instagrams, possible_matches = possible_matches, possible_goal_matches = possible_goal_matches, goal_dictionary = model.goal_dictionary, page = page)
-	
 @app.route("/run_log")
 def display_log():
-	"""Displays links to review the previous runs."""
-
-	# TODO PAGINATION?
+	"""Displays links to review the previous runs, one page at a time."""
 
 	if flask_session.get("email") == None:
 		flash("You must sign in to view that page.")
 		return redirect("/")
 	
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 
-	runs = model.find_all_runs_desc(user)
+	runs, next_cursor = get_run_log_page(user)
 
-	number_of_runs = len(runs)
+	first_page = not request.args.get("cursor")
 
 	# The page variable determines which tabs are active.
 	page = "run"
 
-	return render_template("run_log.html", user = user, runs = runs, page = page, number_of_runs = number_of_runs)
+	return render_template("run_log.html", user = user, runs = runs, page = page, next_cursor = next_cursor, first_page = first_page)
+
+@app.route("/run_log.json")
+@responsecache.cached
+def run_log_data():
+	"""Sends a page of the run log as JSON, along with the cursor 
+	for the next page."""
+
+	user = g.user
+
+	runs, next_cursor = get_run_log_page(user)
+
+	run_list_of_dictionaries = []
+
+	for run in runs:
+		run_list_of_dictionaries.append({"id": run.id, "date": run.date_run.strftime("%m-%d-%Y"), "distance": run.approx_dist, "duration": run.approx_time})
+
+	json_runs = json.dumps({"runs": run_list_of_dictionaries, "next_cursor": next_cursor})
+
+	return json_runs
+
+@app.route("/import_runs", methods=["POST"])
+def import_runs():
+	"""Imports a CSV or JSON Lines file of runs from another app and 
+	sends the user to their run log."""
+
+	if flask_session.get("email") == None:
+		flash("You must sign in to view that page.")
+		return redirect("/")
+
+	user = g.user
+	runs_file = request.files.get("runs_file")
+
+	if runs_file == None or not runs_file.filename:
+		flash("Choose a file of runs to import.")
+		return redirect("/run_log")
+
+	try:
+		file_format = runimport.file_format(runs_file.filename)
+	except ValueError as error:
+		flash(str(error))
+		return redirect("/run_log")
+
+	summary = runimport.import_runs(user, runs_file.stream, file_format)
+
+	flash("Imported %d runs." % summary["imported"])
+	if summary["skipped"]:
+		flash("Skipped %d rows. %s" % (summary["skipped"], " ".join(summary["errors"][:5])))
+
+	return redirect("/run_log")
 
 @app.route("/new_run")
 def new_run():
@@ -235,14 +356,14 @@ def new_run():
 
 	# The page variable determines which tabs are active.
 	page = "run"
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 	routes = model.get_user_routes(user)
 	return render_template("new_run.html", page = page, routes = routes)
 
 @app.route("/add_run", methods = ["POST"])
 def add_run():
 	# User Object
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 	
 	# Getting info from the form. 
 	date_run = request.form.get("new_run_date_and_time")
@@ -270,7 +391,9 @@ def add_run():
 
 	new_run = model.Run(user_id = user.id, date_run = date_run, zipcode=zipcode, approx_dist = distance, approx_time = duration, commit_date = commit_date, route = route)
 	model.insert_new_run(new_run)
-	new_run_object = model.get_latest_run(user)
+	# The run we just saved, rather than looking up the latest one, 
+	# which could be one saved at the same moment somewhere else.
+	new_run_object = new_run
 
 	# Creating rating objects. 
 
@@ -291,6 +414,11 @@ def add_run():
 	for rating in ratings:
 		model.sqla_session.add(rating)
 
+	answers = model.save_run_answers(new_run_object, pre_run.numeric_ans, during_run.numeric_ans, post_run.numeric_ans, energy.numeric_ans, feeling.select_ans, location.select_ans, terrain.select_ans, route_type.select_ans)
+	model.add_run_stats(new_run_object, answers)
+	model.record_milestone_candidates(new_run_object)
+	model.bump_data_version(user.id)
+
 	model.sqla_session.commit()
 
 	redirect_url = "/view_run.html?run_id=" + str(new_run_object.id)
@@ -330,7 +458,7 @@ def review_run():
 	color_two = colors[2]
 	color_three = colors[3]
 
-	score = model.get_run_score(current_run_id)
+	score = current_run.score
 
 	if current_run.route == 0 or current_run.route == None:
 		current_route = None
@@ -386,7 +514,7 @@ def update_run_on_database():
 		return redirect("/")
 
 	# Getting all the relevant info.
-	user = model.get_user_by_email(flask_session["email"]) 
+	user = g.user
 	run_id = request.form.get("run_id")
 	run_object = model.get_run_by_id(run_id)
 	date_run = request.form.get("new_run_date_and_time")
@@ -409,13 +537,20 @@ def update_run_on_database():
 	thoughts = request.form.get("thoughts")
 	instagram_html = request.form.get("instagram_embed")
 
+	# The run stats are keyed by the old answers and date, so the run
+	# comes out of them before anything changes. 
+	model.remove_run_stats(run_object)
+
 	# modifying run
 	run_object.zipcode = zipcode
 	run_object.approx_dist = distance
 	run_object.approx_time = duration
 	if date_run != " ":
 		run_object.date_run = date_run
-	model.sqla_session.commit()
+	# Flushed rather than committed, so the stats come out and go back
+	# in with the same commit below and a failure in between loses
+	# neither.
+	model.sqla_session.flush()
 
 	# Modifying ratings. 
 
@@ -430,6 +565,11 @@ def update_run_on_database():
 	ratings[6].select_ans = terrain
 	ratings[7].select_ans = route
 
+	answers = model.save_run_answers(run_object, pre_run, during_run, post_run, energy, feeling, location, terrain, route)
+	model.add_run_stats(run_object, answers)
+	model.record_milestone_candidates(run_object)
+	model.bump_data_version(user.id)
+
 	model.sqla_session.commit() 
 
 	
@@ -459,6 +599,7 @@ def update_run_on_database():
 # These routes are associated with the graphs. 
 
 @app.route("/bar_chart")
+@responsecache.cached
 def bar_chart():
 	"""Will send the relevant information to the run graph 
 	page in order to construct a bar chart that will show the
@@ -469,76 +610,54 @@ def bar_chart():
 	if number_of_runs == None:
 		number_of_runs = 5
 
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 
-	runs = model.get_collection_of_runs(user.id, runs_to_get = number_of_runs)
+	runs = runcache.get_user_runs(user.id).window(number_of_runs)
 
 	run_list_of_dictionaries = []
 
 	#Changing date in order to jsonify
-	for run in runs:
-		 run_list_of_dictionaries.append({'date': run[0].strftime("%m-%d-%Y"), 'distance': run[1], "score": run[2]})
+	for date_run, distance, score in zip(runs.dates.tolist(), runs.distances.tolist(), runs.scores.tolist()):
+		 run_list_of_dictionaries.append({'date': date_run.strftime("%m-%d-%Y"), 'distance': distance, "score": score})
 
 	json_runs = json.dumps(run_list_of_dictionaries)
 
 	return json_runs
 
 @app.route("/pie_chart")
+@responsecache.cached
 def pie_chart():
 	""" Will return the data required to the run graph page
 	to create a chart that will show the user the percentage of 
 	their runs occur in different locales. """
 
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 
 	number_of_runs = request.args.get("number_of_runs")
 
 	if number_of_runs == None:
 		number_of_runs = 5
 	
-	location_ratings = model.get_location_ratings(user, runs_to_get = number_of_runs)
+	# All three charts are counted from the cached run window, so this
+	# takes no queries past the data version check, however many runs
+	# are asked for.
+	runs = runcache.get_user_runs(user.id).window(number_of_runs)
 
-	location_dictionary = {}
-
-	
-	for rating in location_ratings:
-		if location_dictionary.get(rating.select_ans) == None:
-			location_dictionary[rating.select_ans] = 1
-		else:
-			location_dictionary[rating.select_ans] = location_dictionary[rating.select_ans] + 1
+	location_dictionary = analytics.condition_counts(runs.locations, runs.location_names)
 
 	location_list = []
 
 	for each_key in location_dictionary.keys():
 		location_list.append({"condition": each_key.upper(), "occurances": location_dictionary[each_key], "color": model.location_color_dictionary[each_key] })
 
-	terrain_ratings=model.get_terrain_ratings(user, runs_to_get = number_of_runs)
-
-	terrain_dictionary = {}
-
-	
-	for rating in terrain_ratings:
-		if terrain_dictionary.get(rating.select_ans) == None:
-			terrain_dictionary[rating.select_ans] = 1
-		else:
-			terrain_dictionary[rating.select_ans] = terrain_dictionary[rating.select_ans] + 1
+	terrain_dictionary = analytics.condition_counts(runs.terrains, runs.terrain_names)
 
 	terrain_list = []
 
 	for each_key in terrain_dictionary.keys():
 		terrain_list.append({"condition": each_key.upper(), "occurances": terrain_dictionary[each_key], "color": model.terrain_color_dictionary[each_key] })
 
-	route_ratings=model.get_route_ratings(user, runs_to_get = number_of_runs)
-
-	route_dictionary = {}
-
-
-	
-	for rating in route_ratings:
-		if route_dictionary.get(rating.select_ans) == None:
-			route_dictionary[rating.select_ans] = 1
-		else:
-			route_dictionary[rating.select_ans] = route_dictionary[rating.select_ans] + 1
+	route_dictionary = analytics.condition_counts(runs.route_types, runs.route_type_names)
 
 	route_list = []
 
@@ -550,74 +669,140 @@ def pie_chart():
 
 	return json_conditions
 
+def mood_hierarchy(name, rating_list, include_score = False):
+	"""Builds the bubble chart hierarchy for one of the mood maps
+	out of [rating, distance] pairs."""
+
+	feelings_ratings = {"name": "Root", "children": [{"name": name, "children": [], "size": 800}], "size": 1000}
+
+	for i in range (len(rating_list)):
+		bubble = {"name": str(rating_list[i][0]), "size": rating_list[i][1]}
+		if include_score:
+			bubble["score"] = rating_list[i][0]
+		feelings_ratings["children"][0]["children"].append(bubble)
+
+	return feelings_ratings
+
+@app.route("/mood_map")
+@responsecache.cached
+def all_moods():
+	"""Sends the before, during and after mood maps together, so the 
+	graph page only has to look up the runs once."""
+
+	user = g.user
+
+	number_of_runs = request.args.get("number_of_runs")
+
+	if number_of_runs == None:
+		number_of_runs = 5
+
+	runs = runcache.get_user_runs(user.id).window(number_of_runs)
+
+	before_rating_list = zip(runs.pre_run.tolist(), runs.distances.tolist())
+	during_rating_list = zip(runs.during_run.tolist(), runs.distances.tolist())
+	after_rating_list = zip(runs.post_run.tolist(), runs.distances.tolist())
+
+	moods = {
+		"before": mood_hierarchy("Before Run", before_rating_list), 
+		"during": mood_hierarchy("During Run", during_rating_list), 
+		"after": mood_hierarchy("After Run", after_rating_list, include_score = True)
+	}
+
+	json_moods = json.dumps(moods)
+	return json_moods
+
 @app.route("/mood_map_after")
+@responsecache.cached
 def after_mood():
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 
 	number_of_runs = request.args.get("number_of_runs")
 
-	after_rating_list = model.get_after_ratings(user, runs_to_get = number_of_runs)
+	runs = runcache.get_user_runs(user.id).window(number_of_runs)
 
-	feelings_ratings = {"name": "Root", "children": [{"name": "After Run", "children": [], "size": 800}], "size": 1000}
-	
-	for i in range (len(after_rating_list)):
-		feelings_ratings["children"][0]["children"].append({"name": str(after_rating_list[i][0]), "size": after_rating_list[i][1], "score": after_rating_list[i][0]})
+	after_rating_list = zip(runs.post_run.tolist(), runs.distances.tolist())
 
-	json_feelings = json.dumps(feelings_ratings)
+	json_feelings = json.dumps(mood_hierarchy("After Run", after_rating_list, include_score = True))
 	return json_feelings
 
 @app.route("/mood_map_before")
+@responsecache.cached
 def before_mood():
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 
 	number_of_runs = request.args.get("number_of_runs")
 
 	if number_of_runs == None:
 		number_of_runs = 5
 
-	before_rating_list = model.get_before_ratings(user, runs_to_get = number_of_runs)
-
-	feelings_ratings = {"name": "Root", "children": [{"name": "Before Run", "children": [], "size": 800}], "size": 1000}
-	
-	for i in range (len(before_rating_list)):
-		feelings_ratings["children"][0]["children"].append({"name": str(before_rating_list[i][0]), "size": before_rating_list[i][1]})
-	
-	json_feelings = json.dumps(feelings_ratings)
+	runs = runcache.get_user_runs(user.id).window(number_of_runs)
 
+	before_rating_list = zip(runs.pre_run.tolist(), runs.distances.tolist())
 
+	json_feelings = json.dumps(mood_hierarchy("Before Run", before_rating_list))
 	return json_feelings
 
 
 @app.route("/mood_map_during")
+@responsecache.cached
 def flare_data():
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 
 	number_of_runs = request.args.get("number_of_runs")
 
 	if number_of_runs == None:
 		number_of_runs = 5
 
-	during_rating_list = model.get_during_ratings(user, runs_to_get = number_of_runs)
+	runs = runcache.get_user_runs(user.id).window(number_of_runs)
 
-	feelings_ratings = {"name": "Root", "children": [{"name": "During Run", "children": [], "size": 800}], "size": 1000}
-	
-	for i in range (len(during_rating_list)):
-		feelings_ratings["children"][0]["children"].append({"name": str(during_rating_list[i][0]), "size": during_rating_list[i][1]})
-	
-	
-	json_feelings = json.dumps(feelings_ratings)
+	during_rating_list = zip(runs.during_run.tolist(), runs.distances.tolist())
+
+	json_feelings = json.dumps(mood_hierarchy("During Run", during_rating_list))
 	return json_feelings
 
+def calendar_day(seconds, offset):
+	"""Turns a bound from the calendar, seconds since 1970 at midnight in
+	the browser's timezone, back into that day. offset is the browser's
+	getTimezoneOffset(), in minutes. It's today's offset, so across a 
+	daylight saving change the time is an hour off midnight, which 
+	rounding to the nearest day takes care of."""
+
+	local_time = datetime.utcfromtimestamp(float(seconds)) - timedelta(minutes = float(offset))
+
+	return (local_time + timedelta(hours = 12)).date()
+
 @app.route("/calendar_data.json")
+@responsecache.cached
 def heat_map_data():
-	user = model.get_user_by_email(flask_session["email"])
+	"""Sends the miles run per day for the calendar heat map. The
+	calendar passes the first and last day it is showing as seconds 
+	since 1970, and the browser's timezone offset, so only those days
+	are looked up."""
+
+	user = g.user
+
+	start = request.args.get("start")
+	end = request.args.get("end")
+	offset = request.args.get("offset", 0)
+
+	# Run dates are the browser's local time, so the days are compared
+	# in it too. The last day is included.
+	try:
+		if start != None:
+			start = datetime.combine(calendar_day(start, offset), datetime.min.time())
+		if end != None:
+			end = datetime.combine(calendar_day(end, offset), datetime.min.time()) + timedelta(1)
+	except (ValueError, OverflowError):
+		return "start, end and offset should be numbers.", 400
 
-	runs = model.find_all_runs(user)
+	days = model.get_daily_distance(user.id, start = start, end = end)
 
 	run_dictionary = {}
 
-	for run in runs:
-		run_dictionary[(run.date_run - datetime(1970,1,1)).total_seconds()] = run.approx_dist 
+	for day, distance in days:
+		# Noon keeps the timestamp on the same day in the browser's timezone. 
+		noon = datetime.strptime(day, "%Y-%m-%d") + timedelta(hours = 12)
+		run_dictionary[(noon - datetime(1970,1,1)).total_seconds()] = distance
 
 	run_dictionary = json.dumps(run_dictionary)
 
@@ -650,7 +835,7 @@ def set_goals():
 		flash("You must sign in to view that page.")
 		return redirect("/")
 
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 
 	goals = user.goals
 
@@ -666,10 +851,10 @@ def new_goal():
 		flash("You must sign in to view that page.")
 		return redirect("/")
 
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 
 	page = "goals"
-	return render_template("new_goal.html", user=user, page = page)
+	return render_template("new_goal.html", user=user, page = page, radii = RACE_SEARCH_RADII, default_radius = RACE_SEARCH_RADIUS)
 
 @app.route("/no_race_search")
 def no_race_search():
@@ -694,15 +879,19 @@ def no_race_search():
 
 @app.route("/race_search")
 def race_search():
-	"""Gets information from the goal form, gets it in a form 
-	to make an API call, makes the call, gets the JSON back, de-dups
-	it, then sends the info to the front end."""
+	"""Gets information from the goal form, works out the dates to
+	search, finds the races in the catalog (or from active.com if the 
+	catalog doesn't have any), de-dups them, then sends the info to the
+	front end."""
 
 	goal = request.args.get("goal")
 	zipcode = request.args.get("zipcode")
 
 	fitness = int(request.args.get("fitness_level"))
 	run_length_history = int(request.args.get("run_length_history"))
+	radius = request.args.get("radius", RACE_SEARCH_RADIUS, type = int)
+	if radius not in RACE_SEARCH_RADII:
+		radius = RACE_SEARCH_RADIUS
 	# Base date is the date that the goal is being made. The date
 	# range for the race search is based on when the goal is created. 
 	base_date = date.today()
@@ -714,38 +903,29 @@ def race_search():
 	# max date is the latest to look for a race. 
 	max_date = base_date + timedelta(date_range[1]*7)
 
-	# Setting up and executing the API call.
-	# I decided to go with quality data over quantity.
-	# URL will only return results that have a url associated with the organizer.
-	activity_request_url = "http://api.amp.active.com/v2/search?attributes=" + model.distance_dictionary[goal] + "&category=event&start_date=" + str(min_date) +".."+str(max_date)+"&near="+str(zipcode)+ "&exists=homePageUrlAdr&api_key="+ACTIVEDOTCOM_KEY
-	activity_request = requests.get(activity_request_url)
-
-	content = activity_request.content
-	content_dictionary = json.loads(content)
+	distance = model.distance_dictionary[goal]
 
-	results = content_dictionary[u'results']
-	unique_content = []
+	# Races come from the catalog that ingest_races.py fills in. If it 
+	# has nothing for this search we ask active.com and keep what it sends.
+	# Either way they go through the same distance check, so a search
+	# gets the same races whether or not the catalog had them already.
+	races = [race.result() for race in model.get_catalog_races(distance, min_date, max_date, zipcode, radius = radius)]
 
-	for i in range(len(results)-1):
-		do_not_append_content = False
-		for j in range(i + 1, len(results)):
-			if results[i]['homePageUrlAdr'] == results[j]['homePageUrlAdr']:
-				do_not_append_content = True
-			else:
-				pass
+	if races:
+		races = list(activeclient.unique_races(races))
+	else:
+		saved = model.save_races(distance, activeclient.search_races(distance, min_date, max_date, zipcode, radius = radius))
+		saved.sort(key = lambda race: race.event_date)
+		races = list(activeclient.unique_races([race.result() for race in model.races_near(saved, zipcode, radius)]))
+		model.sqla_session.commit()
 
-		if do_not_append_content == True:
-			pass
-		else:
-			unique_content.append(results[i])
- 	
- 	json_content = json.dumps(unique_content)	
+	json_content = json.dumps(races)
 	return json_content
 
 @app.route("/add_goal", methods=["POST"])
 def add_goal():
 	"""Adds a goal to the database when the user submits the new goal form."""
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 	goal = request.form.get("goal")
 	fitness_level = request.form.get("fitness_level")
 	run_length_history = request.form.get("run_length_history")
@@ -774,6 +954,9 @@ def add_goal():
 		subgoal_to_add = model.Subgoal(goal_id = goal_obj.id, description = subgoal)
 		model.insert_new_subgoal(subgoal_to_add)
 
+	model.bump_data_version(user.id)
+	model.sqla_session.commit()
+
 	return redirect("/goals")
 
 @app.route("/view_goal.html")
@@ -786,19 +969,13 @@ def view_goal():
 		flash("You must sign in to view that page.")
 		return redirect("/")
 
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 	current_goal_id = request.args.get("goal_id")
 	current_goal = model.get_goal_by_id(current_goal_id)
 	subgoals = model.get_subgoals_by_goal_id(current_goal_id)
-	outstanding_subgoals = model.get_outstanding_subgoal_by_goal_id(current_goal_id)
-	runs_after_date = model.get_runs_after_date(user, current_goal.set_date)
+	subgoal_candidates, goal_candidates = model.get_milestone_candidates(user, goal_id = current_goal.id)
 
-	possible_matches = []
-
-	for subgoal in outstanding_subgoals:
-		for run in runs_after_date:
-			if run.approx_dist >= model.distance_int_dictionary[subgoal.description]:
-				possible_matches.append((subgoal, run))
+	possible_matches = [(candidate.subgoal, candidate.run) for candidate in subgoal_candidates]
 
 
 
@@ -818,7 +995,7 @@ def view_goal():
 @app.route("/update_goal")
 def update_goal():
 	"""Will register a subgoal  or goal as complete."""
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 	goal_id = request.args.get("goal_id")
 	current_goal = model.get_goal_by_id(goal_id)
 	# list of all subgoals associated with the goal we are viewing. 
@@ -833,6 +1010,8 @@ def update_goal():
 		if subgoal_id != None:
 			subgoal_obj = model.get_subgoal_by_id(int(subgoal_id))
 			subgoal_obj.date_completed = datetime.now()
+			model.clear_milestone_candidates(subgoal_id = subgoal_obj.id)
+			model.bump_data_version(user.id)
 			model.sqla_session.commit()
 
 	# Determines if the goal was marked as complete. If it was, it updates the database.
@@ -841,6 +1020,8 @@ def update_goal():
 	
 	if goal_complete != None:
 		current_goal.date_completed = datetime.now()
+		model.clear_milestone_candidates(goal_id = current_goal.id)
+		model.bump_data_version(user.id)
 		model.sqla_session.commit()
 
 
@@ -858,74 +1039,33 @@ def display_ideal():
 		flash("You must sign in to view that page.")
 		return redirect("/")
 
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 	# The page variable determines which tabs are active.
 	page = "ideal"
-	runs = model.find_all_runs(user)
+	# The run stats are kept up to date as runs are added and edited, so
+	# this doesn't have to look at the runs themselves. 
+	ideal_stats = model.get_ideal_run_stats(user.id)
 	
 	# Making a generalization about your running habits only makes sense after a certain number of runs. 
 	# If you haven't logged a certain number of runs, it will render a template that 
 	# will tell you that this functionality will appear after more runs are logged. 
 
-	if len(runs) < 10:
+	if ideal_stats["run_count"] < 10:
 		return render_template("go_run.html", page = page)
 
-	run_dictionary = {}
-
-	for run in runs:
-		run_dictionary[run.id] = run
-
-
-	# Finding user's average score and max score. 
-	max_score = 0
-	average_score = 0
-	for run_key in run_dictionary.keys():
-		run_score = model.get_run_score(run_key)
-		if run_score > max_score:
-			max_score = run_score
-		average_score = average_score + run_score
-
-	average_score = average_score/len(run_dictionary.keys())
-
-	# Determining the threshold of what is a "highly rated run" for the indivual user. 
-
-	high_rated_run_threshold = (max_score + average_score) * 0.5
-
-	# Building the highly rated dictionary. 
-	run_dictionary_high_score = {}
-
-	for run_key in run_dictionary.keys():
-		run_score = model.get_run_score(run_key)
-		if run_score >= high_rated_run_threshold:
-			run_dictionary_high_score[run_key] = run_dictionary[run_key]
-
 	# Finding the average distance of highly rated runs.
-	average_dist_high_rated_runs = 0
-
-	for run_key in run_dictionary_high_score.keys():
-		average_dist_high_rated_runs = average_dist_high_rated_runs + run_dictionary_high_score[run_key].approx_dist
-
-	average_dist_high_rated_runs = average_dist_high_rated_runs / len(run_dictionary_high_score.keys())
+	average_dist_high_rated_runs = ideal_stats["high_distance_sum"] / ideal_stats["high_run_count"]
 
 	# Finding the average distance of all user runs. 
-	average_dist_run = 0
-
-	for run_key in run_dictionary.keys():
-		average_dist_run = average_dist_run + run_dictionary[run_key].approx_dist
+	average_dist_run = ideal_stats["distance_sum"] / ideal_stats["run_count"]
 
-	average_dist_run = average_dist_run / len(run_dictionary.keys())
 
+	# Finding the conditions that you prefer. These are the number of 
+	# highly rated runs with each condition. 
 
-	# Finding the conditions that you prefer. 
-
-	locations = []
-	terrains = []
-	routes = []
-
-	for run_key in run_dictionary_high_score.keys():
-		locations.append(model.get_location_by_run_id(run_key).select_ans)
-		terrains.append(model.get_terrain_by_run_id(run_key).select_ans)
-		routes.append(model.get_route_by_run_id(run_key).select_ans)
+	locations = ideal_stats["location"]
+	terrains = ideal_stats["terrain"]
+	routes = ideal_stats["route_type"]
 
 	
 	prefered_terrain = {}
@@ -934,17 +1074,17 @@ def display_ideal():
 	for key in model.terrain_dictionary.keys():
 		# If the prefered terrain dictionary is empty it adds the key to it. 
 		if prefered_terrain == {}:
-			prefered_terrain[key] = (model.terrain_dictionary[key], terrains.count(key))
+			prefered_terrain[key] = (model.terrain_dictionary[key], terrains.get(key, 0))
 		# If the prefered terrain dictionary is not empty, it adds the terrain we are currently
 		# on if they have the same counts. If the current terrain has a higher count, it replaces the
 		# dictionary with one where the current key is the only key. If the count is less than 
 		# what is currently in the dictionary, it moves along. 
-		elif  terrains.count(key) == terrains.count(prefered_terrain.keys()[0]):
-			prefered_terrain[key] = (model.terrain_dictionary[key], terrains.count(key))
+		elif  terrains.get(key, 0) == terrains.get(prefered_terrain.keys()[0], 0):
+			prefered_terrain[key] = (model.terrain_dictionary[key], terrains.get(key, 0))
 					
-		elif terrains.count(key) > terrains.count(prefered_terrain.keys()[0]):
+		elif terrains.get(key, 0) > terrains.get(prefered_terrain.keys()[0], 0):
 			prefered_terrain = {}
-			prefered_terrain[key] = (model.terrain_dictionary[key], terrains.count(key))
+			prefered_terrain[key] = (model.terrain_dictionary[key], terrains.get(key, 0))
 
 		else:
 			pass
@@ -956,17 +1096,17 @@ def display_ideal():
 	for key in model.route_dictionary.keys():
 		# If the prefered route dictionary is empty it adds the key to it. 
 		if prefered_route == {}:
-			prefered_route[key] = (model.route_dictionary[key], routes.count(key))
+			prefered_route[key] = (model.route_dictionary[key], routes.get(key, 0))
 		# If the prefered route dictionary is not empty, it adds the route we are currently
 		# on if they have the same counts. If the current route has a higher count, it replaces the
 		# dictionary with one where the current key is the only key. If the count is less than 
 		# what is currently in the dictionary, it moves along. 
-		elif routes.count(key) == routes.count(prefered_route.keys()[0]):
-			prefered_route[key] = (model.route_dictionary[key], routes.count(key))
+		elif routes.get(key, 0) == routes.get(prefered_route.keys()[0], 0):
+			prefered_route[key] = (model.route_dictionary[key], routes.get(key, 0))
 					
-		elif routes.count(key) > routes.count(prefered_route.keys()[0]):
+		elif routes.get(key, 0) > routes.get(prefered_route.keys()[0], 0):
 			prefered_route = {}
-			prefered_route[key] = (model.route_dictionary[key], routes.count(key))
+			prefered_route[key] = (model.route_dictionary[key], routes.get(key, 0))
 
 		else:
 			pass
@@ -978,17 +1118,17 @@ def display_ideal():
 	for key in model.location_dictionary.keys():
 		# If the prefered location dictionary is empty it adds the key to it. 
 		if prefered_location == {}:
-			prefered_location[key] = (model.location_dictionary[key], locations.count(key))
+			prefered_location[key] = (model.location_dictionary[key], locations.get(key, 0))
 		# If the prefered location dictionary is not empty, it adds the location we are currently
 		# on if they have the same counts. If the current location has a higher count, it replaces the
 		# dictionary with one where the current key is the only key. If the count is less than 
 		# what is currently in the dictionary, it moves along. 
-		elif locations.count(key) == locations.count(prefered_location.keys()[0]):
-			prefered_location[key] = (model.location_dictionary[key], locations.count(key))
+		elif locations.get(key, 0) == locations.get(prefered_location.keys()[0], 0):
+			prefered_location[key] = (model.location_dictionary[key], locations.get(key, 0))
 					
-		elif locations.count(key) > locations.count(prefered_location.keys()[0]):
+		elif locations.get(key, 0) > locations.get(prefered_location.keys()[0], 0):
 			prefered_location = {}
-			prefered_location[key] = (model.location_dictionary[key], locations.count(key))
+			prefered_location[key] = (model.location_dictionary[key], locations.get(key, 0))
 
 		else:
 			pass
@@ -997,25 +1137,25 @@ def display_ideal():
 
 	# Determines the days of the week that tend to have your higher rated runs. 
 
-	weekdays = []
 	weekday_string_list = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
-	# makes a list of weekdays with highly rated runs. 
-	for run_key in run_dictionary_high_score.keys():
-		weekdays.append(run_dictionary_high_score[run_key].date_run.weekday())
+	# number of highly rated runs on each weekday, 0 being Monday. 
+	weekdays = {}
+	for weekday in ideal_stats["weekday"].keys():
+		weekdays[int(weekday)] = ideal_stats["weekday"][weekday]
 
 	prefered_weekday = {}
 
 	for weekday in range(7):
 		if prefered_weekday == {}:
-			prefered_weekday[weekday] = weekdays.count(weekday)
+			prefered_weekday[weekday] = weekdays.get(weekday, 0)
 
-		elif weekdays.count(weekday) == weekdays.count(prefered_weekday.keys()[0]):
-			prefered_weekday[weekday] = weekdays.count(weekday)
+		elif weekdays.get(weekday, 0) == weekdays.get(prefered_weekday.keys()[0], 0):
+			prefered_weekday[weekday] = weekdays.get(weekday, 0)
 
-		elif weekdays.count(weekday) > weekdays.count(prefered_weekday.keys()[0]):
+		elif weekdays.get(weekday, 0) > weekdays.get(prefered_weekday.keys()[0], 0):
 			prefered_weekday = {}
-			prefered_weekday[weekday] = weekdays.count(weekday)
+			prefered_weekday[weekday] = weekdays.get(weekday, 0)
 
 		else:
 			pass
@@ -1051,7 +1191,7 @@ def view_route_library():
 
 	# The page variable determines which tabs are active.
 	page = "route"
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 
 	routes = model.get_user_routes(user)
 	
@@ -1075,7 +1215,7 @@ def create_new_route():
 def add_route_to_db():
 	"""Adds the new route to the database"""
 
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 
 	# Getting info from form. 
 
@@ -1091,6 +1231,7 @@ def add_route_to_db():
 	# adding object to the database. 
 
 	model.sqla_session.add(route)
+	model.bump_data_version(user.id)
 	model.sqla_session.commit()
 	
 
@@ -1106,7 +1247,7 @@ def view_user_route():
 		flash("You must sign in to view that page.")
 		return redirect("/")
 
-	user = model.get_user_by_email(flask_session["email"])
+	user = g.user
 	# The page variable determines which tabs are active.
 	page = "route"
 	current_route_id = request.args.get("route_id")
@@ -1128,6 +1269,23 @@ def end_session():
 
 
 
+@app.route("/debug/sql")
+def sql_debug():
+	"""Shows the SQL statements counted for the latest requests. Only 
+	there when debugging or when SQL_DEBUG is set."""
+
+	if not (app.debug or app.config["SQL_DEBUG"]):
+		return "Not Found", 404
+
+	return jsonify(requests = sqlstats.recent_requests())
+
+@app.route("/metrics")
+def show_metrics():
+	"""Shows the request and active.com call totals in the text format
+	Prometheus scrapes."""
+
+	return Response(metrics.render(), content_type = "text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(debug=True, port=port)
\ No newline at end of file
@@ -0,0 +1,285 @@
+# This file imports a user's run history from a CSV or JSON Lines file,
+# for people bringing their runs over from another app. The file is read
+# a row at a time and checked as it goes. Good rows are written in chunks
+# with model.bulk_insert_runs and committed after every chunk, so a big
+# file never sits in memory and a problem halfway through doesn't lose
+# the runs before it. Rows that don't check out are skipped and reported
+# with their line numbers.
+#
+# Every row needs what the new run form asks for: a date, distance
+# (miles), duration (minutes), the pre_run, during_run, post_run and
+# energy ratings (0 to 5), a feeling, and a location, terrain and
+# route_type from the choices on the form. It can also have zipcode,
+# route (the id of one of the user's routes), thoughts and
+# instagram_embed.
+#
+# python runimport.py user@example.com runs.csv
+
+import os
+import sys
+import csv
+import json
+import math
+import model
+import milestones
+from datetime import datetime
+
+# How many runs to write and commit at a time.
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 1000))
+
+# We stop listing problems after this many, there's no use in more.
+MAX_REPORTED_ERRORS = 100
+
+DATE_FORMATS = ["%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"]
+
+RATING_FIELDS = ["pre_run", "during_run", "post_run", "energy"]
+
+# The answers a condition can have, from the new run form.
+CONDITION_CHOICES = {
+	"location": model.location_dictionary,
+	"terrain": model.terrain_dictionary,
+	"route_type": model.route_dictionary,
+}
+
+
+class ImportRowError(ValueError):
+	"""A row that can't be imported."""
+	pass
+
+
+class ImportFileError(ImportRowError):
+	"""A line that stops the rest of the file from being read."""
+
+	def __init__(self, line_number, message):
+		ImportRowError.__init__(self, message)
+		self.line_number = line_number
+
+
+def file_format(filename):
+	"""Works out the format from the file name: csv or jsonl."""
+
+	extension = os.path.splitext(filename or "")[1].lower()
+
+	if extension == ".csv":
+		return "csv"
+	if extension in [".jsonl", ".json"]:
+		return "jsonl"
+
+	raise ValueError("Runs can be imported from .csv or .jsonl files.")
+
+
+def read_rows(stream, format):
+	"""Yields (line number, dictionary) for each row in the file. A line
+	that can't be read comes back as an ImportRowError instead of the
+	dictionary, so it's skipped like any other bad row."""
+
+	if format == "csv":
+		reader = csv.DictReader(stream)
+		try:
+			for row in reader:
+				try:
+					row = dict((key.strip(), value.decode("utf-8")) for key, value in row.items() if key and value != None)
+				except UnicodeDecodeError:
+					row = ImportRowError("the line isn't UTF-8 text")
+				yield reader.line_num, row
+		except csv.Error as error:
+			# The csv reader can't go on after this, e.g. with the NUL
+			# bytes in a UTF-16 file.
+			raise ImportFileError(reader.line_num + 1, "the file can't be read as UTF-8 CSV (%s), so the rest of it was skipped" % error)
+	else:
+		line_number = 0
+		for line in stream:
+			line_number = line_number + 1
+			if not line.strip():
+				continue
+			try:
+				row = json.loads(line)
+			except UnicodeDecodeError:
+				row = ImportRowError("the line isn't UTF-8 text")
+			except ValueError:
+				row = None
+			yield line_number, row
+
+
+def parse_date(value):
+	for date_format in DATE_FORMATS:
+		try:
+			return datetime.strptime(value.strip(), date_format)
+		except ValueError:
+			pass
+
+	raise ImportRowError("date %r isn't a date like 2015-03-01 or 2015-03-01T07:30" % value)
+
+
+def parse_number(row, field, number_type, minimum = None, maximum = None):
+	value = row.get(field)
+
+	if value in [None, ""]:
+		raise ImportRowError("%s is missing" % field)
+
+	try:
+		number = number_type(value)
+	except (TypeError, ValueError, OverflowError):
+		raise ImportRowError("%s %r isn't a number" % (field, value))
+
+	# nan gets past the range check below, since it isn't less or more
+	# than anything.
+	if math.isnan(number) or math.isinf(number):
+		raise ImportRowError("%s %r isn't a number" % (field, value))
+
+	if (minimum != None and number < minimum) or (maximum != None and number > maximum):
+		raise ImportRowError("%s %r should be between %s and %s" % (field, value, minimum, maximum))
+
+	return number
+
+
+def optional_text(row, field, length = None):
+	value = row.get(field)
+
+	if value in [None, ""]:
+		return None
+
+	value = unicode(value).strip()
+
+	if length != None and len(value) > length:
+		raise ImportRowError("%s is longer than %d characters" % (field, length))
+
+	return value
+
+
+def validate_row(row, user, route_ids):
+	"""Checks a row and turns it into a run for model.bulk_insert_runs.
+	Raises ImportRowError if something is wrong with it."""
+
+	if isinstance(row, ImportRowError):
+		raise row
+
+	if not isinstance(row, dict):
+		raise ImportRowError("the line isn't a JSON object")
+
+	if not row.get("date"):
+		raise ImportRowError("date is missing")
+
+	run = {
+		"user_id": user.id,
+		"date_run": parse_date(unicode(row["date"])),
+		"distance": parse_number(row, "distance", float, 0, 1000),
+		"duration": parse_number(row, "duration", int, 0, 10000),
+		"zipcode": optional_text(row, "zipcode", 16) or user.zipcode,
+		"feeling": optional_text(row, "feeling", 20),
+		"thoughts": optional_text(row, "thoughts") or u"",
+		"instagram_embed": optional_text(row, "instagram_embed"),
+	}
+
+	if run["feeling"] == None:
+		raise ImportRowError("feeling is missing")
+
+	for field in RATING_FIELDS:
+		run[field] = parse_number(row, field, int, 0, 5)
+
+	for field, choices in CONDITION_CHOICES.items():
+		run[field] = optional_text(row, field, 20)
+		if run[field] == None:
+			raise ImportRowError("%s is missing" % field)
+		if run[field] not in choices:
+			raise ImportRowError("%s %r should be one of %s" % (field, run[field], ", ".join(sorted(choices.keys()))))
+
+	run["route"] = None
+	if row.get("route") not in [None, ""]:
+		run["route"] = parse_number(row, "route", int)
+		if run["route"] not in route_ids:
+			raise ImportRowError("route %r isn't one of your routes" % row["route"])
+
+	return run
+
+
+def import_runs(user, stream, format, progress = None):
+	"""Imports the runs in a file for a user. progress, if given, is
+	called with the summary so far after every chunk. Returns a summary
+	dictionary with how many runs were imported, how many rows were
+	skipped and the first few problems."""
+
+	route_ids = set(route.id for route in model.get_user_routes(user))
+
+	summary = {"imported": 0, "skipped": 0, "errors": []}
+	chunk = []
+
+	def write_chunk():
+		model.bulk_insert_runs(chunk)
+		model.sqla_session.commit()
+		summary["imported"] = summary["imported"] + len(chunk)
+		del chunk[:]
+		if progress != None:
+			progress(summary)
+
+	def skip(line_number, error):
+		summary["skipped"] = summary["skipped"] + 1
+		if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+			summary["errors"].append("Line %d: %s" % (line_number, error))
+
+	try:
+		for line_number, row in read_rows(stream, format):
+			try:
+				chunk.append(validate_row(row, user, route_ids))
+			except ImportRowError as error:
+				skip(line_number, error)
+				continue
+
+			if len(chunk) >= IMPORT_CHUNK_SIZE:
+				write_chunk()
+	except ImportFileError as error:
+		skip(error.line_number, error)
+
+	if chunk:
+		write_chunk()
+
+	if summary["imported"]:
+		finish_import(user)
+
+	return summary
+
+
+def finish_import(user):
+	"""Brings everything worked out from a user's runs up to date after
+	an import. The data version goes first, since the milestone index
+	is built from the run cache."""
+
+	model.rebuild_run_stats(user.id)
+	model.bump_data_version(user.id)
+	model.sqla_session.commit()
+
+	milestones.rebuild_milestone_candidates(user)
+
+
+def print_progress(summary):
+	print "%d runs imported, %d rows skipped" % (summary["imported"], summary["skipped"])
+
+
+def main(arguments):
+
+	if len(arguments) != 2:
+		print "Usage: python runimport.py user@example.com runs.csv"
+		return 1
+
+	email, filename = arguments
+
+	user = model.get_user_by_email(email)
+	if user == None:
+		print "There is no user with the email %s." % email
+		return 1
+
+	format = file_format(filename)
+
+	with open(filename, "rb") as stream:
+		summary = import_runs(user, stream, format, progress = print_progress)
+
+	for error in summary["errors"]:
+		print error
+
+	print "Done. %d runs imported, %d rows skipped." % (summary["imported"], summary["skipped"])
+
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,210 @@
+# This file counts and times the SQL statements each request sends.
+# It hooks into model's engines, so every statement is seen no matter
+# which function sends it. After each request the totals go into the
+# X-SQL-Count and X-SQL-Time response headers, and the request is kept
+# in a short list that /debug/sql shows.
+#
+# Statements are also grouped by their shape: the SQL with the values
+# taken out. When the same shape is sent over and over in one request
+# it is usually a query inside a loop (the N+1 problem), so those are
+# reported in the X-SQL-Repeated header and the log.
+#
+# Routes can be given a budget of statements in SQL_BUDGETS. Going over
+# it is logged, or raises QueryBudgetExceeded if SQL_BUDGET_STRICT is
+# on, which it is when the app is testing.
+
+import os
+import re
+import time
+import threading
+from collections import deque
+from flask import request
+from sqlalchemy import event
+
+# A statement shape sent this many times in one request is reported.
+REPEATED_STATEMENT_THRESHOLD = int(os.environ.get("SQL_REPEATED_THRESHOLD", 5))
+
+# How many requests /debug/sql remembers.
+RECENT_REQUESTS = 100
+
+# The most statements each route should need. These are a little above
+# what benchmark.py counts, whatever the number of runs.
+SQL_BUDGETS = {
+	"dashboard": 6,
+	"display_log": 4,
+	"run_log_data": 4,
+	"review_run": 5,
+	"bar_chart": 3,
+	"pie_chart": 3,
+	"all_moods": 3,
+	"after_mood": 3,
+	"before_mood": 3,
+	"flare_data": 3,
+	"heat_map_data": 3,
+	"display_ideal": 3,
+	"view_goal": 6,
+	"race_search": 4,
+}
+
+NUMBERS = re.compile(r"\b\d+\b")
+STRINGS = re.compile(r"'(?:[^']|'')*'")
+# An IN list is the same shape however many values are in it.
+PARAMETER_LISTS = re.compile(r"\?(\s*,\s*\?)+")
+SPACES = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+	"""A request sent more statements than its route's budget."""
+	pass
+
+
+class RequestStats(object):
+	"""The statements sent while handling one request."""
+
+	def __init__(self):
+		self.count = 0
+		self.seconds = 0.0
+		# shape -> [times sent, seconds]
+		self.shapes = {}
+
+	def add(self, statement, seconds):
+		self.count = self.count + 1
+		self.seconds = self.seconds + seconds
+
+		shape = statement_shape(statement)
+		totals = self.shapes.setdefault(shape, [0, 0.0])
+		totals[0] = totals[0] + 1
+		totals[1] = totals[1] + seconds
+
+	def repeated(self, threshold = None):
+		"""Returns [(times sent, shape)] for the shapes sent at least
+		threshold times, most sent first."""
+
+		if threshold == None:
+			threshold = REPEATED_STATEMENT_THRESHOLD
+
+		repeats = [(totals[0], shape) for shape, totals in self.shapes.items() if totals[0] >= threshold]
+		repeats.sort(reverse = True)
+
+		return repeats
+
+
+def statement_shape(statement):
+	"""Takes the values out of a statement so the same query with
+	different values looks the same."""
+
+	shape = STRINGS.sub("?", statement)
+	shape = NUMBERS.sub("?", shape)
+	shape = PARAMETER_LISTS.sub("?", shape)
+
+	return SPACES.sub(" ", shape).strip()
+
+
+# The stats for the request this thread is handling, if any.
+current = threading.local()
+
+recent = deque(maxlen = RECENT_REQUESTS)
+recent_lock = threading.Lock()
+
+
+def start():
+	"""Starts counting statements for this thread."""
+
+	current.stats = RequestStats()
+
+
+def finish():
+	"""Stops counting and returns what was counted, or None."""
+
+	stats = getattr(current, "stats", None)
+	current.stats = None
+
+	return stats
+
+
+# The start time goes on the statement's own context, which is thrown
+# away with it, so a statement that fails doesn't leave anything behind
+# on the pooled connection.
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+	if context != None:
+		context._sqlstats_started = time.time()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+	started = getattr(context, "_sqlstats_started", None)
+
+	stats = getattr(current, "stats", None)
+	if stats != None and started != None:
+		stats.add(statement, time.time() - started)
+
+
+def listen(engine):
+	"""Starts watching the statements an engine sends."""
+
+	event.listen(engine, "before_cursor_execute", before_cursor_execute)
+	event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def recent_requests():
+	"""Returns the requests /debug/sql shows, newest first."""
+
+	with recent_lock:
+		return list(reversed(recent))
+
+
+def init_app(app, *engines):
+	"""Counts the statements the engines send for every request the
+	app handles."""
+
+	app.config.setdefault("SQL_BUDGETS", SQL_BUDGETS)
+	app.config.setdefault("SQL_BUDGET_STRICT", os.environ.get("SQL_BUDGET_STRICT") == "1")
+	app.config.setdefault("SQL_DEBUG", os.environ.get("SQL_DEBUG") == "1")
+
+	# The read engine can be the write engine, which should only be
+	# counted once.
+	for engine in set(engines):
+		listen(engine)
+
+	@app.before_request
+	def start_counting():
+		start()
+
+	@app.after_request
+	def report_statements(response):
+		stats = finish()
+
+		if stats == None:
+			return response
+
+		repeats = stats.repeated()
+
+		response.headers["X-SQL-Count"] = str(stats.count)
+		response.headers["X-SQL-Time"] = "%.3f" % (stats.seconds * 1000)
+
+		if repeats:
+			response.headers["X-SQL-Repeated"] = str(len(repeats))
+			for times, shape in repeats:
+				app.logger.warning("%s sent the same statement %d times: %s", request.path, times, shape)
+
+		# Looking at /debug/sql shouldn't push out what we came to see.
+		if request.endpoint != "sql_debug":
+			with recent_lock:
+				recent.append({
+					"path": request.full_path,
+					"endpoint": request.endpoint,
+					"status": response.status_code,
+					"count": stats.count,
+					"time_ms": round(stats.seconds * 1000, 3),
+					"repeated": [{"times": times, "statement": shape} for times, shape in repeats],
+				})
+
+		budget = app.config["SQL_BUDGETS"].get(request.endpoint)
+
+		if budget != None and stats.count > budget:
+			message = "%s sent %d statements, its budget is %d" % (request.endpoint, stats.count, budget)
+			if app.config["SQL_BUDGET_STRICT"] or app.testing:
+				raise QueryBudgetExceeded(message)
+			response.headers["X-SQL-Over-Budget"] = str(stats.count - budget)
+			app.logger.warning(message)
+
+		return response
@@ -0,0 +1,197 @@
+# Checks the race search client in activeclient.py against mock_active.py,
+# which is served on a free port on this machine for the length of the
+# tests, so nothing here talks to active.com:
+# python -m unittest test_activeclient
+
+import os
+import time
+import socket
+import threading
+import unittest
+import requests
+from datetime import date
+
+os.environ.setdefault("ACTIVEDOTCOM_KEY", "test")
+
+import activeclient
+import mock_active
+import metrics
+from lrucache import LRUCache
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+DISTANCE = "Distance%20(running):5k"
+MIN_DATE = date(2030, 3, 1)
+MAX_DATE = date(2030, 6, 1)
+
+server = []
+
+
+class QuietHandler(WSGIRequestHandler):
+	"""Doesn't print a line for every page the mock serves."""
+
+	def log_request(self, *args):
+		pass
+
+
+def setUpModule():
+	server.append(make_server("127.0.0.1", 0, mock_active.app, threaded = True, request_handler = QuietHandler))
+	# The timeout tests hang up on the mock before it answers, which it
+	# would otherwise print a traceback for.
+	server[0].handle_error = lambda request, client_address: None
+	threading.Thread(target = server[0].serve_forever).start()
+	activeclient.ACTIVEDOTCOM_URL = "http://127.0.0.1:%d/v2/search" % server[0].server_port
+
+
+def tearDownModule():
+	server[0].shutdown()
+
+
+def mock_searches():
+	"""How many pages the mock has served."""
+
+	return mock_active.searches["count"]
+
+
+class RaceCacheTest(unittest.TestCase):
+
+	def setUp(self):
+		self.real_cache = activeclient.race_cache
+		activeclient.race_cache = LRUCache(2, ttl = 60)
+
+	def tearDown(self):
+		activeclient.race_cache = self.real_cache
+
+	def search(self, zipcode, min_date = MIN_DATE, max_date = MAX_DATE):
+		return activeclient.search_races(DISTANCE, min_date, max_date, zipcode)
+
+	def test_same_search_is_answered_from_the_cache(self):
+		races = self.search("94577")
+		served = mock_searches()
+
+		self.assertEqual(self.search("94577"), races)
+		self.assertEqual(mock_searches(), served)
+
+	def test_each_part_of_the_key_is_a_different_search(self):
+		self.search("94577")
+
+		for zipcode, min_date, max_date in [("94110", MIN_DATE, MAX_DATE), ("94577", date(2030, 3, 2), MAX_DATE), ("94577", MIN_DATE, date(2030, 6, 2))]:
+			served = mock_searches()
+			self.search(zipcode, min_date, max_date)
+			self.assertTrue(mock_searches() > served)
+
+		served = mock_searches()
+		activeclient.search_races("Distance%20(running):10k", MIN_DATE, MAX_DATE, "94577")
+		self.assertTrue(mock_searches() > served)
+
+	def test_searches_expire(self):
+		activeclient.race_cache = LRUCache(2, ttl = 0.2)
+		self.search("94577")
+		time.sleep(0.3)
+
+		served = mock_searches()
+		self.search("94577")
+		self.assertTrue(mock_searches() > served)
+
+	def test_least_recently_used_search_is_dropped(self):
+		self.search("94577")
+		self.search("94110")
+		# Using 94577 again leaves 94110 as the least recently used.
+		self.search("94577")
+		self.search("94601")
+
+		served = mock_searches()
+		self.search("94577")
+		self.assertEqual(mock_searches(), served)
+
+		self.search("94110")
+		self.assertTrue(mock_searches() > served)
+
+
+class UniqueRacesTest(unittest.TestCase):
+
+	def test_keeps_the_first_of_each_race_and_the_last_result(self):
+		first = {"homePageUrlAdr": "http://a", "assetName": "first"}
+		again = {"homePageUrlAdr": "http://a", "assetName": "again"}
+		last = {"homePageUrlAdr": "http://b", "assetName": "last"}
+
+		self.assertEqual(list(activeclient.unique_races([first, again, last])), [first, last])
+
+	def test_one_result(self):
+		only = {"homePageUrlAdr": "http://a"}
+
+		self.assertEqual(list(activeclient.unique_races([only])), [only])
+
+
+class FetchRacesTest(unittest.TestCase):
+
+	def setUp(self):
+		self.settings = (mock_active.MOCK_DELAY, mock_active.MOCK_FAIL_PAGES, activeclient.CONNECT_TIMEOUT, activeclient.READ_TIMEOUT, activeclient.ACTIVEDOTCOM_URL)
+
+	def tearDown(self):
+		mock_active.MOCK_DELAY, mock_active.MOCK_FAIL_PAGES, activeclient.CONNECT_TIMEOUT, activeclient.READ_TIMEOUT, activeclient.ACTIVEDOTCOM_URL = self.settings
+
+	def fetch(self, zipcode = "94577"):
+		return activeclient.fetch_races(DISTANCE, MIN_DATE, MAX_DATE, zipcode, pages = 10)
+
+	def test_pages_are_merged_in_order(self):
+		results = self.fetch()
+
+		# The mock lists every other race twice, so all its pages together
+		# hold more results than there are races.
+		self.assertEqual(len(results), mock_active.RACES_PER_SEARCH * 3 // 2)
+		self.assertTrue(len(results) > activeclient.RACES_PER_PAGE)
+
+		races = list(activeclient.unique_races(results))
+		self.assertEqual([race["assetName"] for race in races], ["Mock Race %d" % number for number in range(mock_active.RACES_PER_SEARCH)])
+
+	def test_a_failed_extra_page_is_skipped(self):
+		mock_active.MOCK_FAIL_PAGES = set([2])
+		errors = metrics.call_errors.values.get(("active.com",), 0)
+
+		results = self.fetch()
+
+		self.assertEqual(len(results), mock_active.RACES_PER_SEARCH * 3 // 2 - activeclient.RACES_PER_PAGE)
+		# It isn't lost without a trace, it's counted on /metrics.
+		self.assertEqual(metrics.call_errors.values.get(("active.com",)), errors + 1)
+
+	def test_a_failed_first_page_fails_the_search(self):
+		mock_active.MOCK_FAIL_PAGES = set([1])
+
+		self.assertRaises(requests.HTTPError, self.fetch)
+
+	def test_slow_pages_time_out(self):
+		mock_active.MOCK_DELAY = 0.5
+		activeclient.READ_TIMEOUT = 0.1
+
+		started = time.time()
+		self.assertRaises(requests.Timeout, self.fetch)
+		self.assertTrue(time.time() - started < 0.5)
+
+	def test_connecting_times_out(self):
+		# A socket that never accepts, with its queue already full, so
+		# connecting to it hangs.
+		listener = socket.socket()
+		listener.bind(("127.0.0.1", 0))
+		listener.listen(0)
+		waiting = []
+		for i in range(3):
+			client = socket.socket()
+			client.setblocking(0)
+			client.connect_ex(listener.getsockname())
+			waiting.append(client)
+
+		activeclient.ACTIVEDOTCOM_URL = "http://127.0.0.1:%d/v2/search" % listener.getsockname()[1]
+		activeclient.CONNECT_TIMEOUT = 0.1
+
+		try:
+			started = time.time()
+			self.assertRaises(requests.Timeout, self.fetch)
+			self.assertTrue(time.time() - started < 1)
+		finally:
+			for client in waiting:
+				client.close()
+			listener.close()
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,23 @@
+# Checks the chart number crunching in analytics.py:
+# python -m unittest test_analytics
+
+import unittest
+import numpy
+import analytics
+
+
+class ConditionCountsTest(unittest.TestCase):
+
+	def test_counts_each_condition(self):
+		codes = numpy.array([0, 2, 2, 0, 2])
+
+		self.assertEqual(analytics.condition_counts(codes, [u"city", u"park", u"trail"]), {u"city": 2, u"trail": 3})
+
+	def test_no_runs(self):
+		codes = numpy.array([], dtype = numpy.int64)
+
+		self.assertEqual(analytics.condition_counts(codes, []), {})
+
+
+if __name__ == "__main__":
+	unittest.main()
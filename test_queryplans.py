@@ -0,0 +1,46 @@
+# Runs the check from queryplans.py with the tests, so a query that
+# stops using its index fails the build:
+# python -m unittest test_queryplans
+
+import unittest
+import queryplans
+
+
+class QueryPlanTest(unittest.TestCase):
+
+	def tearDown(self):
+		queryplans.clean_up()
+
+	def test_no_full_table_scans(self):
+		checked, failures = queryplans.find_full_scans()
+
+		self.assertTrue(checked)
+
+		messages = ["%s does a full table scan: %s\n%s" % (name, ", ".join(scans), statement) for name, statement, scans in failures]
+		self.assertEqual(messages, [], "\n\n".join(messages))
+
+
+class ScansInPlanTest(unittest.TestCase):
+
+	def test_table_scans(self):
+		self.assertEqual(queryplans.scans_in_plan(["SCAN TABLE runs"]), ["SCAN TABLE runs"])
+		self.assertEqual(queryplans.scans_in_plan(["SCAN runs"]), ["SCAN runs"])
+
+	def test_index_order_scan_on_its_own(self):
+		plan = ["SCAN TABLE runs USING INDEX ix_runs_user_date"]
+		self.assertEqual(queryplans.scans_in_plan(plan), plan)
+
+		plan = ["SCAN runs USING COVERING INDEX ix_runs_user_date"]
+		self.assertEqual(queryplans.scans_in_plan(plan), plan)
+
+	def test_index_order_scan_with_a_search(self):
+		plan = ["SCAN TABLE runs USING INDEX ix_runs_user_date", "SEARCH TABLE run_answers USING INDEX ix_run_answers_run (run_id=?)"]
+		self.assertEqual(queryplans.scans_in_plan(plan), [])
+
+	def test_searches_and_small_tables(self):
+		self.assertEqual(queryplans.scans_in_plan(["SEARCH TABLE runs USING INDEX ix_runs_user_date (user_id=?)", "SCAN TABLE questions"]), [])
+
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,66 @@
+# This file keeps recently seen users in memory, so a request can find
+# its user from the id in the session without a query. Almost every
+# page needs the user, and the chart page asks for six things at once.
+#
+# The cached users aren't in any session. get_user merges a copy into
+# the request's session without loading it from the database, so the
+# request can use it like any other user, relationships and all.
+#
+# A user is dropped from the cache when it's saved, and after
+# USER_CACHE_TTL seconds in case it was changed by another process.
+# The cached data_version goes stale as runs are saved, so read that
+# with model.get_data_version, as runcache does.
+
+import os
+import model
+from lrucache import LRUCache
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+
+# The number of users kept in memory at once.
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 1024))
+
+# Seconds before a cached user is looked up again.
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", 300))
+
+cache = LRUCache(USER_CACHE_SIZE, ttl = USER_CACHE_TTL)
+
+
+def load_user(user_id):
+	"""Returns a user that isn't in any session, or None. It's built from
+	the row, so no user the session already has is touched."""
+
+	row = model.sqla_session.query(model.User.__table__).filter(model.User.id == user_id).first()
+
+	if row == None:
+		return None
+
+	user = model.User(**row._asdict())
+	make_transient_to_detached(user)
+
+	return user
+
+
+def get_user(user_id):
+	"""Returns the user with this id in the current session, or None."""
+
+	user = cache.get(user_id)
+
+	if user == None:
+		user = load_user(user_id)
+		if user == None:
+			return None
+		cache.set(user_id, user)
+
+	return model.sqla_session.merge(user, load = False)
+
+
+def invalidate(user_id):
+	"""Drops a user from this process's cache."""
+
+	cache.delete(user_id)
+
+
+@event.listens_for(model.User, "after_update")
+def user_saved(mapper, connection, target):
+	invalidate(target.id)
@@ -0,0 +1,144 @@
+# This file knows where zipcodes are. It loads the zipcode centroids
+# from the Census Gazetteer ZCTA file, which python zipgeo.py downloads
+# to data/zcta_gazetteer.txt, and works out distances with the haversine
+# formula. If the file isn't there we don't know where any zipcode is,
+# so callers match races on the first three digits of the zipcode, and
+# a warning says how to get the file. Set ZIP_CENTROIDS_REQUIRED=1 to
+# make the app refuse to start without it instead.
+
+import io
+import os
+import zipfile
+import warnings
+import threading
+import requests
+from math import radians, degrees, sin, cos, asin, sqrt
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ZIP_CENTROIDS_FILE = os.environ.get("ZIP_CENTROIDS_FILE", os.path.join(HERE, "data", "zcta_gazetteer.txt"))
+
+# With this set a missing file is an error, see check_centroids.
+ZIP_CENTROIDS_REQUIRED = os.environ.get("ZIP_CENTROIDS_REQUIRED") == "1"
+
+# Where python zipgeo.py gets the file from.
+ZIP_CENTROIDS_URL = os.environ.get("ZIP_CENTROIDS_URL", "https://www2.census.gov/geo/docs/maps-data/data/gazetteer/2023_Gazetteer/2023_Gaz_zcta_national.zip")
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LATITUDE = 69.0
+
+
+def haversine(latitude1, longitude1, latitude2, longitude2):
+	"""Returns the distance in miles between two points."""
+
+	latitude1, longitude1, latitude2, longitude2 = map(radians, [latitude1, longitude1, latitude2, longitude2])
+
+	a = sin((latitude2 - latitude1) / 2) ** 2 + cos(latitude1) * cos(latitude2) * sin((longitude2 - longitude1) / 2) ** 2
+
+	return 2 * EARTH_RADIUS_MILES * asin(min(1, sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius):
+	"""Returns (min latitude, max latitude, min longitude, max longitude)
+	of a box that holds every point within radius miles."""
+
+	latitude_change = radius / MILES_PER_DEGREE_LATITUDE
+
+	# Degrees of longitude get shorter towards the poles.
+	cos_latitude = cos(radians(min(abs(latitude) + latitude_change, 89.9)))
+	longitude_change = min(degrees(radius / (EARTH_RADIUS_MILES * cos_latitude)), 180)
+
+	return latitude - latitude_change, latitude + latitude_change, longitude - longitude_change, longitude + longitude_change
+
+
+def load_centroids(path):
+	"""Reads a Gazetteer ZCTA file into a dictionary of
+	zipcode -> (latitude, longitude)."""
+
+	centroids = {}
+
+	with open(path) as centroid_file:
+		header = [column.strip() for column in centroid_file.readline().split("\t")]
+		zipcode_column = header.index("GEOID")
+		latitude_column = header.index("INTPTLAT")
+		longitude_column = header.index("INTPTLONG")
+
+		for line in centroid_file:
+			columns = line.split("\t")
+			if len(columns) < len(header):
+				continue
+			centroids[columns[zipcode_column].strip()] = (float(columns[latitude_column]), float(columns[longitude_column]))
+
+	return centroids
+
+
+def download_centroids(path = ZIP_CENTROIDS_FILE, url = ZIP_CENTROIDS_URL):
+	"""Downloads the zipped Gazetteer ZCTA file and saves the file inside
+	it to path. Returns how many zipcodes it has."""
+
+	response = requests.get(url, timeout = 60)
+	response.raise_for_status()
+
+	archive = zipfile.ZipFile(io.BytesIO(response.content))
+	names = [name for name in archive.namelist() if name.endswith(".txt")]
+	if not names:
+		raise IOError("There's no .txt file in %s" % url)
+
+	directory = os.path.dirname(path)
+	if directory and not os.path.isdir(directory):
+		os.makedirs(directory)
+
+	# Written next to it first, so a download that fails halfway doesn't
+	# leave half a file behind.
+	with open(path + ".part", "wb") as centroid_file:
+		centroid_file.write(archive.read(names[0]))
+	os.rename(path + ".part", path)
+
+	return len(load_centroids(path))
+
+
+# The centroids are loaded the first time they're needed. loaded gets
+# an entry once we've looked for the file, so a missing one is only
+# looked for, and warned about, once.
+centroids = {}
+loaded = []
+centroids_lock = threading.Lock()
+
+
+def missing_message():
+	return "There are no zipcode centroids at %s, so races are matched on the first three digits of the zipcode. Run python zipgeo.py to download them." % ZIP_CENTROIDS_FILE
+
+
+def get_centroids():
+	"""Returns the dictionary of zipcode -> (latitude, longitude), loading
+	it if this is the first call. It's empty if there's no file."""
+
+	with centroids_lock:
+		if not centroids and not loaded:
+			loaded.append(True)
+			if ZIP_CENTROIDS_FILE and os.path.exists(ZIP_CENTROIDS_FILE):
+				centroids.update(load_centroids(ZIP_CENTROIDS_FILE))
+			elif ZIP_CENTROIDS_FILE:
+				warnings.warn(missing_message(), RuntimeWarning)
+		return centroids
+
+
+def check_centroids():
+	"""Raises IOError if ZIP_CENTROIDS_REQUIRED is set and the file isn't
+	there. The app calls this when it starts."""
+
+	if ZIP_CENTROIDS_REQUIRED and not (ZIP_CENTROIDS_FILE and os.path.exists(ZIP_CENTROIDS_FILE)):
+		raise IOError(missing_message())
+
+
+def locate(zipcode):
+	"""Returns (latitude, longitude) of a zipcode's centroid, or None if
+	we don't know where it is."""
+
+	if not zipcode:
+		return None
+
+	return get_centroids().get(str(zipcode).strip()[:5])
+
+
+if __name__ == "__main__":
+	print "Saved %d zipcodes to %s." % (download_centroids(), ZIP_CENTROIDS_FILE)